@@ -1,16 +1,19 @@
 {
     'name': 'Survey Certificate Template',
-    'version': '1.0',
+    'version': '1.2',
     'summary': 'Addons upload/replace/delete template sertifikat',
     'author': 'rafi',
     'license': 'LGPL-3',
     'depends': ['survey','website'],
     'data': [
         'security/ir.model.access.csv',
+        'data/ir_cron_data.xml',
+        'data/ir_sequence_data.xml',
         'views/survey_certificate_menu.xml',
         'views/certificate_template_views.xml',
         'views/survey_survey_views.xml',
         'views/certificate_editor_template.xml',
+        'views/certificate_verify_templates.xml',
         'report/certification_report_template.xml',
     ],
     'installable': True,
@@ -1,9 +1,13 @@
-from odoo import http
+from odoo import fields, http
+from odoo.exceptions import MissingError, UserError, ValidationError
 from odoo.http import request
-import base64
+import hmac
 import json
 import logging
 
+from ..tools.metrics import to_prometheus
+from ..tools.render import RenderParams, format_certificate_date
+
 _logger = logging.getLogger(__name__)
 
 
@@ -18,40 +22,203 @@ class SurveyCertificateController(http.Controller):
         if not survey.exists() or not survey.certification:
             return request.not_found()
         
+        if survey.certificate_template_id:
+            params = RenderParams(
+                name=request.env.user.name or 'Participant',
+                date_str=format_certificate_date(fields.Date.today()),
+                survey_title=survey.title or '',
+                score='100%',
+                serial='PREVIEW',
+            )
+            return self._make_preview_response(survey.certificate_template_id, params)
+        
+        # Default Odoo layouts still need a user_input for the QWeb report
         fake_user_input = request.env['survey.user_input'].sudo().create({
             'survey_id': survey.id,
             'email': request.env.user.email or 'demo@example.com',
             'partner_id': request.env.user.partner_id.id,
             'test_entry': True,
         })
+        try:
+            report = request.env.ref('survey.certification_report')
+            pdf_content, _ = report.sudo()._render_qweb_pdf(report, [fake_user_input.id])
+        finally:
+            fake_user_input.sudo().unlink()
         
-        if survey.certificate_template_id:
-            cert_image = fake_user_input.certification_report_image
-            
-            if cert_image:
-                fake_user_input.sudo().unlink()
-                
-                return request.make_response(
-                    base64.b64decode(cert_image),
-                    headers=[
-                        ('Content-Type', 'image/png'),
-                        ('Content-Disposition', 'inline; filename="certificate_preview.png"')
-                    ]
-                )
+        return request.make_response(
+            pdf_content,
+            headers=[
+                ('Content-Type', 'application/pdf'),
+                ('Content-Disposition', 'inline; filename="certificate_preview.pdf"')
+            ]
+        )
+
+    def _make_preview_response(self, template, params):
+        data = template._render_preview(params)
+        return request.make_response(
+            data,
+            headers=[
+                ('Content-Type', template.output_mimetype),
+                ('Content-Disposition', f'inline; filename="certificate_preview.{template._get_output_extension()}"')
+            ]
+        )
+
+    @http.route('/survey/certificate/download/<int:user_input_id>', type='http', auth='user')
+    def certificate_download(self, user_input_id, **kwargs):
+        """Return the certificate image of a participation as raw bytes"""
+        user_input = request.env['survey.user_input'].browse(user_input_id)
         
-        report = request.env.ref('survey.certification_report')
-        pdf_content, _ = report.sudo()._render_qweb_pdf([fake_user_input.id])
+        if not user_input.exists():
+            return request.not_found()
         
-        fake_user_input.sudo().unlink()
+        user_input.check_access('read')
+        template = user_input.survey_id.certificate_template_id
+        if not template._has_background():
+            return request.not_found()
         
+        data = user_input.sudo()._get_certificate_data()
+        if not data:
+            return request.not_found()
         return request.make_response(
-            pdf_content,
+            data,
+            headers=[
+                ('Content-Type', template.output_mimetype),
+                ('Content-Disposition', f'attachment; filename="certificate_{user_input.id}.{template._get_output_extension()}"'),
+            ]
+        )
+
+    @http.route('/certificate/editor/preview/<int:template_id>', type='http', auth='user')
+    def editor_preview(self, template_id, name=None, **kwargs):
+        """Render the saved layout of a template with sample data"""
+        template = request.env['survey.certificate.template'].browse(template_id)
+        
+        if not template.exists() or not template._has_background():
+            return request.not_found()
+        
+        params = RenderParams(
+            name=name or 'Participant Name',
+            date_str=format_certificate_date(fields.Date.today()),
+            survey_title='Survey Title',
+            score='100%',
+            serial='PREVIEW',
+        )
+        return self._make_preview_response(template, params)
+
+    @http.route('/survey/certificate/pdf/<int:survey_id>', type='http', auth='user')
+    def certificates_pdf(self, survey_id, **kwargs):
+        """Stream one PDF with a page per passed participant, for bulk printing"""
+        survey = request.env['survey.survey'].browse(survey_id)
+        
+        if not survey.exists() or not survey.certificate_template_id:
+            return request.not_found()
+        
+        # A PDF without pages is rejected by most viewers
+        user_inputs = survey._get_certificate_user_inputs()
+        if not user_inputs:
+            return request.not_found()
+        
+        exported = survey._prepare_certificate_export(user_inputs)
+        if exported is None:
+            return self._export_queued_response()
+        
+        return request.make_response(
+            survey._iter_certificates_pdf(exported),
             headers=[
                 ('Content-Type', 'application/pdf'),
-                ('Content-Disposition', 'inline; filename="certificate_preview.pdf"')
+                ('Content-Disposition', f'inline; filename="certificates_{survey.id}.pdf"'),
+            ]
+        )
+
+    @http.route('/survey/certificate/zip/<int:survey_id>', type='http', auth='user')
+    def certificates_zip(self, survey_id, **kwargs):
+        """Stream a ZIP of the stored certificates of every passed participant"""
+        survey = request.env['survey.survey'].browse(survey_id)
+        
+        if not survey.exists() or not survey.certificate_template_id:
+            return request.not_found()
+        
+        user_inputs = survey._get_certificate_user_inputs()
+        if not user_inputs:
+            return request.not_found()
+        
+        exported = survey._prepare_certificate_export(user_inputs)
+        if exported is None:
+            return self._export_queued_response()
+        
+        return request.make_response(
+            survey._iter_certificates_zip(exported),
+            headers=[
+                ('Content-Type', 'application/zip'),
+                ('Content-Disposition', f'attachment; filename="certificates_{survey.id}.zip"'),
             ]
         )
 
+    def _export_queued_response(self):
+        return request.make_response(
+            "The certificates are generated in the background. "
+            "You will be notified on the survey when they are ready.",
+            headers=[('Content-Type', 'text/plain; charset=utf-8')],
+            status=202,
+        )
+
+    @http.route('/certificate/verify/<string:serial>', type='http', auth='public', website=True, sitemap=False)
+    def verify_certificate(self, serial, **kwargs):
+        """Public verification of a serial; reads the issue index, never renders"""
+        issue = request.env['survey.certificate.issue']._lookup(serial)
+        
+        if kwargs.get('format') == 'json':
+            if issue:
+                issue = dict(issue, issue_date=fields.Date.to_string(issue['issue_date']))
+                issue.pop('id', None)
+            return request.make_response(
+                json.dumps({'valid': bool(issue), 'certificate': issue}),
+                headers=[('Content-Type', 'application/json')],
+                status=200 if issue else 404,
+            )
+        
+        response = request.render('survey_certificate_template.certificate_verify_page', {
+            'issue': issue,
+            'serial': serial,
+        })
+        if not issue:
+            response.status_code = 404
+        return response
+
+    def _metrics_allowed(self, token):
+        """System users, or anyone presenting the configured scrape token"""
+        if request.env.user.has_group('base.group_system'):
+            return True
+        expected = request.env['ir.config_parameter'].sudo().get_param('survey_certificate_template.metrics_token')
+        return bool(expected and token and hmac.compare_digest(expected, token))
+
+    @http.route('/certificate/metrics', type='http', auth='public')
+    def render_metrics(self, token=None, **kwargs):
+        """Render counters and stage latencies of the process serving this request"""
+        if not self._metrics_allowed(token):
+            return request.not_found()
+        
+        snapshot = request.env['survey.certificate.template'].sudo()._get_render_metrics()
+        return request.make_response(
+            json.dumps(snapshot),
+            headers=[('Content-Type', 'application/json'), ('Cache-Control', 'no-store')]
+        )
+
+    @http.route('/certificate/metrics/prometheus', type='http', auth='public')
+    def render_metrics_prometheus(self, token=None, **kwargs):
+        """Same as /certificate/metrics in Prometheus text exposition format"""
+        if not self._metrics_allowed(token):
+            return request.not_found()
+        
+        snapshot = request.env['survey.certificate.template'].sudo()._get_render_metrics()
+        gauges = {}
+        for cache_name, stats in snapshot['caches'].items():
+            for key in ('entries', 'bytes', 'hits', 'misses', 'evictions'):
+                gauges[f'{cache_name}_cache_{key}'] = stats[key]
+        return request.make_response(
+            to_prometheus(snapshot, gauges),
+            headers=[('Content-Type', 'text/plain; version=0.0.4'), ('Cache-Control', 'no-store')]
+        )
+
     @http.route('/certificate/editor/<int:template_id>', type='http', auth='user', website=True)
     def certificate_editor(self, template_id, **kwargs):
         """Visual certificate editor page"""
@@ -64,76 +231,113 @@ class SurveyCertificateController(http.Controller):
             'template': template,
         })
 
-    @http.route('/certificate/template/image/<int:template_id>', type='http', auth='user')
-    def get_template_image(self, template_id, **kwargs):
-        """Return template image as binary PNG"""
+    def _stream_template_field(self, template_id, field_name):
+        """Serve a template binary straight from the filestore.
+
+        The response carries the attachment checksum as a strong ETag and its
+        write date as Last-Modified, so the editor's conditional requests are
+        answered with 304 Not Modified instead of the full image.
+        """
         template = request.env['survey.certificate.template'].browse(template_id)
         
-        if not template.exists() or not template.file:
-            _logger.warning(f"Template {template_id} not found or has no file")
+        if not template.exists():
             return request.not_found()
         
         try:
-            image_data = base64.b64decode(template.file)
-            _logger.info(f"Serving template image {template_id}, size: {len(image_data)} bytes")
-            
-            return request.make_response(
-                image_data,
-                headers=[
-                    ('Content-Type', 'image/png'),
-                    ('Cache-Control', 'no-cache'),
-                ]
-            )
-        except Exception as e:
-            _logger.error(f"Error decoding template image: {e}", exc_info=True)
+            stream = request.env['ir.binary']._get_stream_from(template, field_name)
+        except (MissingError, UserError):
+            _logger.warning(f"Template {template_id} has no {field_name}")
             return request.not_found()
+        
+        return stream.get_response()
 
-    @http.route('/certificate/template/logo/<int:template_id>', type='http', auth='user')
-    def get_template_logo(self, template_id, **kwargs):
-        """Return logo image as binary PNG"""
+    @http.route('/certificate/template/image/<int:template_id>', type='http', auth='user')
+    def get_template_image(self, template_id, **kwargs):
+        """Return template image with its stored content type"""
+        return self._stream_template_field(template_id, 'file')
+
+    def _stream_template_asset(self, template_id, asset_field):
+        """Serve a shared asset of a template, with the same caching headers"""
         template = request.env['survey.certificate.template'].browse(template_id)
         
-        if not template.exists() or not template.logo_image:
+        if not template.exists() or not template[asset_field]:
             return request.not_found()
         
-        try:
-            image_data = base64.b64decode(template.logo_image)
-            
-            return request.make_response(
-                image_data,
-                headers=[
-                    ('Content-Type', 'image/png'),
-                    ('Cache-Control', 'no-cache'),
-                ]
-            )
-        except Exception as e:
-            _logger.error(f"Error decoding logo image: {e}", exc_info=True)
-            return request.not_found()
+        template.check_access('read')
+        stream = request.env['ir.binary']._get_stream_from(template[asset_field].sudo(), 'image')
+        return stream.get_response()
+
+    @http.route('/certificate/template/logo/<int:template_id>', type='http', auth='user')
+    def get_template_logo(self, template_id, **kwargs):
+        """Return logo image with its stored content type"""
+        return self._stream_template_asset(template_id, 'logo_asset_id')
 
     @http.route('/certificate/template/signature/<int:template_id>', type='http', auth='user')
     def get_template_signature(self, template_id, **kwargs):
-        """Return signature image as binary PNG"""
+        """Return signature image with its stored content type"""
+        return self._stream_template_asset(template_id, 'signature_asset_id')
+
+    @http.route('/certificate/template/proxy_info/<int:template_id>', type='json', auth='user')
+    def get_template_proxy_info(self, template_id, width=1280, **kwargs):
+        """Describe the downscaled background the editor should load"""
+        template = request.env['survey.certificate.template'].browse(template_id)
+        
+        if not template.exists():
+            return {'success': False, 'error': 'Template not found'}
+        
+        template.check_access('read')
+        proxy = template._get_editor_proxy(int(width))
+        if not proxy:
+            return {'success': False, 'error': 'Template has no file'}
+        
+        if proxy['attachment']:
+            url = f"/certificate/template/proxy/{template.id}/{proxy['attachment'].id}"
+        else:
+            url = f"/certificate/template/image/{template.id}"
+        
+        return {
+            'success': True,
+            'url': url,
+            'width': proxy['width'],
+            'height': proxy['height'],
+            'full_width': proxy['full_width'],
+            'full_height': proxy['full_height'],
+            'scale': proxy['scale'],
+        }
+
+    @http.route('/certificate/template/proxy/<int:template_id>/<int:attachment_id>', type='http', auth='user')
+    def get_template_proxy(self, template_id, attachment_id, **kwargs):
+        """Return a downscaled background; the URL changes with the background"""
         template = request.env['survey.certificate.template'].browse(template_id)
         
-        if not template.exists() or not template.signature_image:
+        if not template.exists():
             return request.not_found()
         
-        try:
-            image_data = base64.b64decode(template.signature_image)
-            
-            return request.make_response(
-                image_data,
-                headers=[
-                    ('Content-Type', 'image/png'),
-                    ('Cache-Control', 'no-cache'),
-                ]
-            )
-        except Exception as e:
-            _logger.error(f"Error decoding signature image: {e}", exc_info=True)
+        template.check_access('read')
+        attachment = request.env['ir.attachment'].sudo().browse(attachment_id)
+        if not attachment.exists() or attachment.res_model != template._name or attachment.res_id != template.id:
             return request.not_found()
+        
+        stream = request.env['ir.binary']._record_to_stream(attachment, 'raw')
+        return stream.get_response(immutable=True)
+
+    @staticmethod
+    def _layout_to_full_resolution(layout):
+        """Map editor coordinates from the proxy canvas back to the full image"""
+        scale = float(layout.pop('scale', 1) or 1)
+        if scale == 1:
+            return layout
+        
+        layout['canvas_width'] = layout['canvas_width'] / scale
+        layout['canvas_height'] = layout['canvas_height'] / scale
+        for obj in layout.get('objects', []):
+            for key in ('left', 'top', 'width', 'height', 'fontSize'):
+                if key in obj:
+                    obj[key] = obj[key] / scale
+        return layout
 
     @http.route('/certificate/editor/save', type='json', auth='user', methods=['POST'])
-    def save_editor_layout(self, template_id, layout, **kwargs):
+    def save_editor_layout(self, template_id, layout, revision=None, **kwargs):
         """Save layout configuration from visual editor"""
         template = request.env['survey.certificate.template'].browse(int(template_id))
         
@@ -142,44 +346,23 @@ class SurveyCertificateController(http.Controller):
         
         try:
             _logger.info(f"Saving layout for template {template.id}")
+            template._validate_layout(layout)
+            layout = self._layout_to_full_resolution(layout)
             
-            template.write({
-                'layout_json': json.dumps(layout)
-            })
-            
-            for obj in layout.get('objects', []):
-                if obj['id'] == 'name':
-                    template.write({
-                        'name_position_y': int((obj['top'] / layout['canvas_height']) * 100),
-                        'name_font_size': int(obj.get('fontSize', 60)),
-                        'name_color': obj.get('fill', '#000000'),
-                    })
-                    
-                elif obj['id'] == 'date':
-                    name_obj = next((o for o in layout['objects'] if o['id'] == 'name'), None)
-                    if name_obj:
-                        offset = obj['top'] - name_obj['top']
-                        template.write({
-                            'date_position_offset': int(offset),
-                            'date_font_size': int(obj.get('fontSize', 30)),
-                            'date_color': obj.get('fill', '#000000'),
-                        })
-                        
-                elif obj['id'] == 'logo':
-                    template.write({
-                        'logo_position_x': int((obj['left'] / layout['canvas_width']) * 100),
-                        'logo_position_y': int((obj['top'] / layout['canvas_height']) * 100),
-                    })
-                    
-                elif obj['id'] == 'signature':
-                    template.write({
-                        'signature_position_x': int(((obj['left'] + obj['width']/2) / layout['canvas_width']) * 100),
-                        'signature_position_y': int((obj['top'] / layout['canvas_height']) * 100),
-                    })
+            new_revision = template._save_editor_layout(layout, revision)
+            if new_revision is False:
+                return {
+                    'success': False,
+                    'conflict': True,
+                    'revision': template.layout_revision,
+                    'error': 'This layout was saved from another session. Reload the editor to see it.',
+                }
             
             _logger.info("Layout saved successfully")
-            return {'success': True}
+            return {'success': True, 'revision': new_revision}
             
+        except ValidationError as e:
+            return {'success': False, 'error': str(e)}
         except Exception as e:
             _logger.error(f"Error saving layout: {str(e)}", exc_info=True)
             return {'success': False, 'error': str(e)}
@@ -198,11 +381,12 @@ class SurveyCertificateController(http.Controller):
                 _logger.info(f"Loaded layout for template {template.id}")
                 return {
                     'success': True,
-                    'layout': layout
+                    'layout': layout,
+                    'revision': template.layout_revision,
                 }
             else:
                 _logger.info(f"No saved layout found for template {template.id}")
-                return {'success': True, 'layout': None}
+                return {'success': True, 'layout': None, 'revision': template.layout_revision}
                 
         except Exception as e:
             _logger.error(f"Error loading layout: {str(e)}", exc_info=True)
@@ -0,0 +1,36 @@
+from odoo import api, SUPERUSER_ID
+from odoo.exceptions import ValidationError
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    """Move per-template logo and signature binaries to shared assets"""
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    Attachment = env['ir.attachment']
+    Asset = env['survey.certificate.asset']
+    Template = env['survey.certificate.template'].with_context(active_test=False)
+
+    for field_name, asset_field, label in (
+        ('logo_image', 'logo_asset_id', 'Logo'),
+        ('signature_image', 'signature_asset_id', 'Signature'),
+    ):
+        attachments = Attachment.search([
+            ('res_model', '=', Template._name),
+            ('res_field', '=', field_name),
+        ])
+        skipped = Attachment
+        for attachment in attachments:
+            template = Template.browse(attachment.res_id).exists()
+            if not template or not attachment.raw:
+                continue
+            try:
+                asset = Asset._get_or_create(attachment.raw, f"{template.name} - {label}")
+            except ValidationError as e:
+                _logger.warning(f"Template {template.id} {field_name} not moved to a shared asset: {e}")
+                skipped |= attachment
+                continue
+            template.write({asset_field: asset.id})
+        _logger.info(f"Moved {len(attachments - skipped)} template {field_name} binaries to shared assets")
+        (attachments - skipped).unlink()
@@ -0,0 +1,7 @@
+from odoo import api, SUPERUSER_ID
+
+
+def migrate(cr, version):
+    """Validate and normalize the backgrounds of existing templates once"""
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    env['survey.certificate.template'].with_context(active_test=False).search([])._normalize_file()
@@ -1,2 +1,8 @@
+from . import certificate_image_mixin
+from . import certificate_asset
+from . import certificate_font
+from . import certificate_issue
+from . import certificate_render_job
 from . import certificate_template
+from . import ir_actions_report
 from . import survey_survey
@@ -0,0 +1,105 @@
+from odoo import models, fields, api
+from odoo.exceptions import ValidationError
+import base64
+import hashlib
+from io import BytesIO
+from PIL import Image, UnidentifiedImageError
+
+from ..tools.render_cache import LRUCache, image_nbytes
+
+# Decoded and resized asset images, shared by every template using the asset:
+# {(asset id, checksum, width, height): PIL image}
+_rendition_cache = LRUCache(64 * 1024 * 1024, sizeof=image_nbytes)
+
+
+class SurveyCertificateAsset(models.Model):
+    _name = 'survey.certificate.asset'
+    _inherit = ['survey.certificate.image.mixin']
+    _description = 'Survey Certificate Asset'
+
+    name = fields.Char("Name", required=True)
+    image = fields.Binary("Image", required=True, attachment=True)
+    checksum = fields.Char("Checksum", readonly=True, index=True, copy=False, help="SHA-1 of the image bytes")
+    width = fields.Integer("Width (px)", readonly=True)
+    height = fields.Integer("Height (px)", readonly=True)
+    template_count = fields.Integer("Used by Templates", compute='_compute_template_count')
+
+    _sql_constraints = [
+        ('checksum_uniq', 'unique(checksum)', "This image is already stored as another asset."),
+    ]
+
+    def _compute_template_count(self):
+        Template = self.env['survey.certificate.template']
+        for asset in self:
+            asset.template_count = Template.search_count([
+                '|', ('logo_asset_id', '=', asset.id), ('signature_asset_id', '=', asset.id),
+            ])
+
+    @api.model
+    def _get_image_values(self, raw):
+        """Checksum and dimensions of image bytes, read from the header only"""
+        try:
+            img = Image.open(BytesIO(raw))
+        except UnidentifiedImageError:
+            raise ValidationError("The asset file is not a supported image.")
+        return {
+            'checksum': hashlib.sha1(raw).hexdigest(),
+            'width': img.width,
+            'height': img.height,
+        }
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        for vals in vals_list:
+            if vals.get('image'):
+                vals.update(self._get_image_values(base64.b64decode(vals['image'])))
+        return super().create(vals_list)
+
+    def write(self, vals):
+        if vals.get('image'):
+            vals = dict(vals, **self._get_image_values(base64.b64decode(vals['image'])))
+        self._forget_renditions()
+        return super().write(vals)
+
+    def unlink(self):
+        self._forget_renditions()
+        return super().unlink()
+
+    @api.model
+    def _get_or_create(self, raw, name):
+        """Return the asset holding ``raw`` image bytes, creating it if needed"""
+        checksum = hashlib.sha1(raw).hexdigest()
+        asset = self.with_context(active_test=False).search([('checksum', '=', checksum)], limit=1)
+        if not asset:
+            asset = self.create({'name': name, 'image': base64.b64encode(raw)})
+        return asset
+
+    def _forget_renditions(self):
+        ids = set(self.ids)
+        if ids:
+            _rendition_cache.invalidate(lambda key: key[0] in ids)
+
+    @api.model
+    def _get_rendition_cache_stats(self):
+        return _rendition_cache.stats()
+
+    def _get_rendition(self, width, height=None):
+        """Return the image resized to ``width`` x ``height`` (read-only).
+
+        ``height`` defaults to keeping the aspect ratio. Renditions are
+        cached per process and shared by every template using this asset.
+        """
+        self.ensure_one()
+        width = max(int(round(width)), 1)
+        if height is None:
+            height = self.height * width / self.width if self.width else width
+        height = max(int(round(height)), 1)
+
+        key = (self.id, self.checksum, width, height)
+        rendition = _rendition_cache.get(key)
+        if rendition is None:
+            img = self._decode_binary_image('image')
+            if img.mode not in ('RGB', 'RGBA'):
+                img = img.convert('RGBA')
+            rendition = _rendition_cache.put(key, img.resize((width, height), Image.Resampling.LANCZOS))
+        return rendition
@@ -0,0 +1,50 @@
+from odoo import models, fields, api
+from odoo.exceptions import ValidationError
+import base64
+from io import BytesIO
+from PIL import ImageFont
+
+from ..tools.fonts import forget_font
+
+
+class SurveyCertificateFont(models.Model):
+    _name = 'survey.certificate.font'
+    _description = 'Survey Certificate Font'
+
+    name = fields.Char("Font Family", required=True)
+    font_file = fields.Binary("Regular TTF", required=True)
+    font_filename = fields.Char("Regular Filename")
+    bold_font_file = fields.Binary("Bold TTF", help="Used for the participant name. Falls back to the regular font.")
+    bold_font_filename = fields.Char("Bold Filename")
+    active = fields.Boolean(default=True)
+
+    @api.constrains('font_file', 'bold_font_file')
+    def _check_font_files(self):
+        for font in self:
+            for field_name in ('font_file', 'bold_font_file'):
+                if not font[field_name]:
+                    continue
+                try:
+                    ImageFont.truetype(BytesIO(base64.b64decode(font[field_name])), 10)
+                except OSError:
+                    raise ValidationError(f"{font._fields[field_name].string} of '{font.name}' is not a valid TrueType/OpenType font.")
+
+    def write(self, vals):
+        self._forget_cached_fonts()
+        return super().write(vals)
+
+    def unlink(self):
+        self._forget_cached_fonts()
+        return super().unlink()
+
+    def _forget_cached_fonts(self):
+        ids = set(self.ids)
+        if ids:
+            forget_font(lambda key: isinstance(key, tuple) and key[0] == self._name and key[1] in ids)
+
+    def _get_font_source(self, bold=False):
+        """Return a ``tools.fonts.get_font`` source for this font"""
+        self.ensure_one()
+        field_name = 'bold_font_file' if bold and self.bold_font_file else 'font_file'
+        key = (self._name, self.id, self.write_date, field_name)
+        return key, lambda: base64.b64decode(self[field_name])
@@ -0,0 +1,32 @@
+from odoo import models
+import base64
+from io import BytesIO
+from PIL import Image
+
+
+class SurveyCertificateImageMixin(models.AbstractModel):
+    _name = 'survey.certificate.image.mixin'
+    _description = 'Survey Certificate Image Mixin'
+
+    def _get_field_attachment(self, field_name):
+        """ir.attachment holding a binary field of this record"""
+        self.ensure_one()
+        return self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', '=', self.id),
+            ('res_field', '=', field_name),
+        ], limit=1)
+
+    @staticmethod
+    def _open_attachment_image(attachment):
+        """Open an attachment with PIL; only the header is read until pixels are needed"""
+        if attachment.store_fname:
+            return Image.open(attachment._full_path(attachment.store_fname))
+        return Image.open(BytesIO(attachment.raw))
+
+    def _decode_binary_image(self, field_name):
+        """Open a binary field lazily, from the filestore when it is stored there"""
+        attachment = self._get_field_attachment(field_name)
+        if attachment:
+            return self._open_attachment_image(attachment)
+        return Image.open(BytesIO(base64.b64decode(self[field_name])))
@@ -0,0 +1,56 @@
+from odoo import models, fields, api
+import hashlib
+import secrets
+
+
+class SurveyCertificateIssue(models.Model):
+    _name = 'survey.certificate.issue'
+    _description = 'Issued Survey Certificate'
+    _rec_name = 'serial'
+    _order = 'id desc'
+
+    serial = fields.Char("Serial", required=True, readonly=True, index=True, copy=False)
+    user_input_id = fields.Many2one('survey.user_input', string="Participation", required=True, index=True, ondelete='cascade')
+    survey_id = fields.Many2one(related='user_input_id.survey_id', store=True)
+    # Snapshots printed on the certificate and shown on verification, read from this row only
+    participant_name = fields.Char("Participant", readonly=True)
+    survey_title = fields.Char("Survey", readonly=True)
+    score = fields.Char("Score", readonly=True)
+    issue_date = fields.Date("Issued On", required=True, readonly=True, default=fields.Date.context_today)
+    content_hash = fields.Char("Content Hash", readonly=True, index=True, help="SHA-256 of the last stored certificate image")
+
+    _sql_constraints = [
+        ('serial_uniq', 'unique(serial)', "Certificate serials must be unique."),
+        ('user_input_uniq', 'unique(user_input_id)', "A participation has one certificate serial."),
+    ]
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        for vals in vals_list:
+            if not vals.get('serial'):
+                vals['serial'] = self._new_serial()
+        return super().create(vals_list)
+
+    @api.model
+    def _new_serial(self):
+        """Sequence number plus a random suffix, so serials cannot be enumerated"""
+        number = self.env['ir.sequence'].sudo().next_by_code('survey.certificate.issue') or ''
+        return f"{number}-{secrets.token_hex(3).upper()}"
+
+    @api.model
+    def _lookup(self, serial):
+        """Verification data of ``serial`` in one indexed read, or None"""
+        rows = self.sudo().search_read(
+            [('serial', '=', serial)],
+            ['serial', 'participant_name', 'survey_title', 'score', 'issue_date', 'content_hash'],
+            limit=1,
+        )
+        return rows[0] if rows else None
+
+    @api.model
+    def _record_content(self, rendered):
+        """Store the content hash of ``(user_input id, name, image bytes)`` renditions"""
+        hashes = {user_input_id: hashlib.sha256(data).hexdigest() for user_input_id, __, data in rendered}
+        for issue in self.sudo().search([('user_input_id', 'in', list(hashes))]):
+            if issue.content_hash != hashes[issue.user_input_id.id]:
+                issue.content_hash = hashes[issue.user_input_id.id]
@@ -0,0 +1,129 @@
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+from odoo.tools import config
+from datetime import timedelta
+import logging
+
+from ..tools.metrics import metrics
+
+_logger = logging.getLogger(__name__)
+
+# Jobs claimed per cron run (``certificate_queue_batch`` in odoo.conf), and
+# attempts before a job is left in the failed state
+DEFAULT_QUEUE_BATCH = 100
+MAX_ATTEMPTS = 5
+
+
+class SurveyCertificateRenderJob(models.Model):
+    _name = 'survey.certificate.render.job'
+    _description = 'Survey Certificate Render Job'
+    _order = 'id desc'
+
+    user_input_id = fields.Many2one('survey.user_input', string="Participation", required=True, index=True, ondelete='cascade')
+    survey_id = fields.Many2one(related='user_input_id.survey_id', store=True, index=True)
+    state = fields.Selection(
+        [('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed'), ('cancelled', 'Cancelled')],
+        default='pending',
+        required=True,
+        index=True,
+    )
+    attempts = fields.Integer(default=0, readonly=True)
+    next_attempt = fields.Datetime("Next Attempt", help="Retries of failed renders wait until then")
+    error = fields.Text(readonly=True)
+    attachment_id = fields.Many2one('ir.attachment', string="Certificate", ondelete='set null', readonly=True)
+    done_date = fields.Datetime("Done On", readonly=True)
+
+    @api.model
+    def _enqueue(self, user_inputs):
+        """Queue a render for each participation without a pending job"""
+        if not user_inputs:
+            return self
+        pending = self.search([('user_input_id', 'in', user_inputs.ids), ('state', '=', 'pending')])
+        todo = user_inputs - pending.user_input_id
+        jobs = self.create([{'user_input_id': user_input.id} for user_input in todo])
+        if jobs:
+            cron = self.env.ref('survey_certificate_template.ir_cron_certificate_render_jobs', raise_if_not_found=False)
+            if cron:
+                cron._trigger()
+        return jobs
+
+    def action_retry(self):
+        self.write({'state': 'pending', 'attempts': 0, 'next_attempt': False, 'error': False})
+        self.env.ref('survey_certificate_template.ir_cron_certificate_render_jobs')._trigger()
+
+    @api.model
+    def _cron_process_jobs(self):
+        """Render a batch of pending jobs.
+
+        Jobs are claimed with ``FOR UPDATE SKIP LOCKED`` so concurrent runs
+        (several cron workers, or a manual run) never render the same job.
+        The cron is re-triggered while pending jobs remain.
+        """
+        batch = int(config.get('certificate_queue_batch') or DEFAULT_QUEUE_BATCH)
+        self.env.cr.execute("""
+            SELECT id FROM survey_certificate_render_job
+             WHERE state = 'pending'
+               AND (next_attempt IS NULL OR next_attempt <= (now() AT TIME ZONE 'UTC'))
+          ORDER BY id
+             LIMIT %s
+               FOR UPDATE SKIP LOCKED
+        """, [batch])
+        jobs = self.browse([row[0] for row in self.env.cr.fetchall()])
+        jobs._process()
+        if jobs and self.env['survey.survey'].sudo().search_count([('certificate_export_user_id', '!=', False)], limit=1):
+            self.env.ref('survey_certificate_template.ir_cron_certificate_exports')._trigger()
+
+        remaining = self.search_count([('state', '=', 'pending'), '|', ('next_attempt', '=', False), ('next_attempt', '<=', fields.Datetime.now())])
+        self.env['ir.cron']._notify_progress(done=len(jobs), remaining=remaining)
+
+    def _process(self):
+        """Render the jobs survey by survey, one bulk batch each"""
+        for survey in self.survey_id:
+            jobs = self.filtered(lambda job: job.survey_id == survey)
+            try:
+                with self.env.cr.savepoint():
+                    jobs._render_survey_batch(survey)
+            except Exception as e:
+                _logger.warning(f"Certificate render jobs {jobs.ids} failed: {e}")
+                jobs._record_failure(str(e))
+
+    def _render_survey_batch(self, survey):
+        if survey.certificate_template_id._has_background():
+            eligible = survey._get_certificate_user_inputs([('id', 'in', self.user_input_id.ids)])
+        else:
+            eligible = self.env['survey.user_input']
+        cancelled = self.filtered(lambda job: job.user_input_id not in eligible)
+        cancelled.write({'state': 'cancelled'})
+
+        jobs = self - cancelled
+        if not jobs:
+            return
+        jobs.user_input_id._issue_certificates()
+        stored = survey._generate_certificates_bulk(domain=[('id', 'in', jobs.user_input_id.ids)])
+        attachment_of = {attachment.res_id: attachment for attachment in stored}
+        missing = jobs.filtered(lambda job: job.user_input_id.id not in attachment_of)
+        if missing:
+            raise UserError(f"Rendered certificates could not be stored for {len(missing)} participation(s).")
+
+        now = fields.Datetime.now()
+        for job in jobs:
+            job.write({
+                'state': 'done',
+                'attachment_id': attachment_of[job.user_input_id.id].id,
+                'done_date': now,
+                'error': False,
+            })
+        metrics.inc('render_jobs_done', len(jobs))
+
+    def _record_failure(self, error):
+        """Retry with exponential backoff, give up after ``MAX_ATTEMPTS``"""
+        metrics.inc('render_jobs_failed', len(self))
+        now = fields.Datetime.now()
+        for job in self:
+            attempts = job.attempts + 1
+            job.write({
+                'attempts': attempts,
+                'error': error,
+                'state': 'failed' if attempts >= MAX_ATTEMPTS else 'pending',
+                'next_attempt': now + timedelta(minutes=2 ** attempts),
+            })
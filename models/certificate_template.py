@@ -1,20 +1,101 @@
 from odoo import models, fields, api
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools import config
+import base64
 import json
+import logging
+import re
+from io import BytesIO
+from PIL import ImageDraw, features
+
+from ..tools.draw_plan import DrawPlan, QrOp, TextOp, draw_op, execute_plan, paste_scaled
+from ..tools.fonts import detach_font_source, font_cache_stats, get_font, resolve_system_font
+from ..tools.memory import ImageTooLarge, decode_within_budget
+from ..tools.metrics import metrics
+from ..tools.normalize import InvalidImage, normalize_image
+from ..tools.pdf import DEFAULT_DPI
+from ..tools.qr import qr_available
+from ..tools.render import OUTPUT_FORMATS, encode_image, render_certificate_to
+from ..tools.render_cache import LRUCache, image_nbytes
+
+_logger = logging.getLogger(__name__)
+
+# Compiled draw plans (decoded background with static elements composited,
+# resolved fonts and anchors), keyed on the template revision (see
+# _render_cache_key). Size configurable in odoo.conf with
+# ``certificate_render_cache_mb``.
+DEFAULT_RENDER_CACHE_MB = 256
+_prepared_canvas_cache = LRUCache(
+    DEFAULT_RENDER_CACHE_MB * 1024 * 1024,
+    sizeof=lambda plan: image_nbytes(plan.base),
+)
+
+# Editor layout objects: images by id, texts by their ``field`` (defaulting
+# to the id) mapped to the RenderParams attribute they print
+LAYOUT_IMAGE_IDS = ('logo', 'signature')
+LAYOUT_TEXT_FIELDS = {
+    'name': 'name',
+    'date': 'date_str',
+    'survey_title': 'survey_title',
+    'score': 'score',
+    'serial': 'serial',
+    'static': 'static',
+}
+HEX_COLOR = re.compile(r'^#[0-9a-fA-F]{3}([0-9a-fA-F]{3})?$')
+# Participant texts are shrunk to stay this far (fraction of the image
+# width) from the left and right edges
+TEXT_MARGIN = 0.05
+
+# Downscaled backgrounds served to the visual editor
+EDITOR_PROXY_PREFIX = 'editor_proxy_'
+EDITOR_PROXY_WIDTHS = (640, 960, 1280, 1920)
+
+# Memory budget mode (odoo.conf): ``certificate_render_memory_mb`` caps the
+# decompressed size of a background, ``certificate_oversize_policy`` says
+# whether larger ones are downscaled (default) or refused. Renders then draw
+# on the cached base in place instead of a copy.
+OVERSIZE_POLICIES = ('downscale', 'refuse')
+# Uploaded backgrounds larger than ``certificate_upload_max_dimension``
+# pixels (odoo.conf, 0 = no cap) are stored downscaled for rendering
+
+# Last preview per template: {template id: (render key + params, png bytes)}
+_preview_cache = LRUCache(32 * 1024 * 1024, sizeof=lambda entry: len(entry[1]))
+
 
 class SurveyCertificateTemplate(models.Model):
     _name = 'survey.certificate.template'
+    _inherit = ['survey.certificate.image.mixin']
     _description = 'Survey Certificate Template'
 
     name = fields.Char("Template Name", required=True)
     file = fields.Binary("Template File", required=True)
     filename = fields.Char("Filename")
+    # Filled at upload (_prepare_file_values): a flattened RGB copy of the
+    # background when the upload is not render-ready, and its metadata
+    render_file = fields.Binary("Render-Ready Background", readonly=True, copy=False)
+    image_width = fields.Integer("Width (px)", readonly=True, copy=False)
+    image_height = fields.Integer("Height (px)", readonly=True, copy=False)
+    image_mode = fields.Char("Color Mode", readonly=True, copy=False)
+    image_dpi = fields.Float("Resolution (DPI)", readonly=True, copy=False)
+    image_checksum = fields.Char("Checksum", readonly=True, copy=False, help="SHA-1 of the uploaded file")
     active = fields.Boolean(default=True)
+    font_id = fields.Many2one(
+        'survey.certificate.font',
+        string="Font Family",
+        help="Uploaded font used for all texts. Leave empty to use the system font."
+    )
     
     # TAMBAHKAN: Field untuk simpan layout editor
     layout_json = fields.Text(
         "Layout Configuration",
         help="JSON configuration for certificate layout from visual editor"
     )
+    layout_revision = fields.Integer(
+        "Layout Revision",
+        default=0,
+        readonly=True,
+        help="Incremented on every editor save, used to detect concurrent edits"
+    )
     
     # Pengaturan posisi NAMA
     name_position_y = fields.Integer(
@@ -37,18 +118,177 @@ class SurveyCertificateTemplate(models.Model):
     
     # Pengaturan LOGO
     show_logo = fields.Boolean("Show Logo", default=False)
-    logo_image = fields.Binary("Logo Image")
+    logo_asset_id = fields.Many2one(
+        'survey.certificate.asset',
+        string="Logo Asset",
+        ondelete='restrict',
+        help="Shared logo image; uploading a Logo Image reuses the asset with the same content"
+    )
+    logo_image = fields.Binary("Logo Image", compute='_compute_asset_images', inverse='_inverse_logo_image')
     logo_position_x = fields.Integer("Logo Position X (%)", default=10)
     logo_position_y = fields.Integer("Logo Position Y (%)", default=10)
     logo_width = fields.Integer("Logo Width (px)", default=150)
     
     # Pengaturan SIGNATURE
     show_signature = fields.Boolean("Show Signature", default=False)
-    signature_image = fields.Binary("Signature Image")
+    signature_asset_id = fields.Many2one(
+        'survey.certificate.asset',
+        string="Signature Asset",
+        ondelete='restrict',
+        help="Shared signature image; uploading a Signature Image reuses the asset with the same content"
+    )
+    signature_image = fields.Binary("Signature Image", compute='_compute_asset_images', inverse='_inverse_signature_image')
     signature_position_x = fields.Integer("Signature Position X (%)", default=50)
     signature_position_y = fields.Integer("Signature Position Y (%)", default=75)
     signature_width = fields.Integer("Signature Width (px)", default=200)
     signature_label = fields.Char("Signature Label", default="Manager")
+    
+    # Pengaturan VERIFIKASI
+    show_verification_qr = fields.Boolean(
+        "Show Verification QR Code",
+        help="Print a QR code linking to the public verification page, with the serial below it. "
+             "Needs the qrcode Python library; without it only the serial is printed."
+    )
+    verification_qr_x = fields.Integer("QR Position X (%)", default=85)
+    verification_qr_y = fields.Integer("QR Position Y (%)", default=80)
+    verification_qr_size = fields.Integer("QR Size (px)", default=150)
+    
+    # Pengaturan OUTPUT
+    output_format = fields.Selection(
+        [('png', 'PNG'), ('jpeg', 'JPEG'), ('webp', 'WebP')],
+        string="Output Format",
+        default='png',
+        required=True,
+        help="PNG is lossless; JPEG and WebP are much smaller for photographic backgrounds"
+    )
+    output_mimetype = fields.Char("Output Mimetype", compute='_compute_output_mimetype')
+    output_quality = fields.Integer("Quality", default=90, help="JPEG/WebP quality (1-100)")
+    png_compress_level = fields.Integer(
+        "PNG Compression Level",
+        default=6,
+        help="0 (fastest, largest) to 9 (slowest, smallest)"
+    )
+    png_optimize = fields.Boolean("Optimize PNG", help="Extra encoder pass for smaller files, slower to encode")
+    palette_colors = fields.Integer(
+        "Palette Colors",
+        default=0,
+        help="Quantize PNG output to this many colours (2-256), for flat-colour designs. 0 keeps full colour."
+    )
+    output_dpi = fields.Integer(
+        "Target DPI",
+        default=0,
+        help="Downscale backgrounds with a higher resolution to this DPI. 0 keeps the background resolution."
+    )
+    output_max_dimension = fields.Integer(
+        "Max Dimension (px)",
+        default=0,
+        help="Downscale so the longest side is at most this many pixels. 0 means no limit."
+    )
+
+    @api.depends('logo_asset_id.image', 'signature_asset_id.image')
+    def _compute_asset_images(self):
+        for template in self:
+            template.logo_image = template.logo_asset_id.image
+            template.signature_image = template.signature_asset_id.image
+
+    def _inverse_logo_image(self):
+        for template in self:
+            template.logo_asset_id = template._get_asset_for(template.logo_image, f"{template.name} - Logo")
+
+    def _inverse_signature_image(self):
+        for template in self:
+            template.signature_asset_id = template._get_asset_for(template.signature_image, f"{template.name} - Signature")
+
+    def _has_background(self):
+        """Whether a background is uploaded, checked without reading the file"""
+        return bool(self and self.with_context(bin_size=True).file)
+
+    def _get_asset_for(self, image, name):
+        """Shared asset holding base64 ``image``; identical uploads share one asset"""
+        if not image:
+            return self.env['survey.certificate.asset']
+        return self.env['survey.certificate.asset']._get_or_create(base64.b64decode(image), name)
+
+    @api.depends('output_format')
+    def _compute_output_mimetype(self):
+        for template in self:
+            template.output_mimetype = OUTPUT_FORMATS[template._get_output_format()][0]
+
+    @api.constrains('output_format', 'output_quality', 'png_compress_level', 'palette_colors', 'output_dpi', 'output_max_dimension')
+    def _check_output_settings(self):
+        for template in self:
+            if template.output_format == 'webp' and not features.check('webp'):
+                raise ValidationError("WebP output is not available: Pillow was built without WebP support.")
+            if not 1 <= template.output_quality <= 100:
+                raise ValidationError("Quality must be between 1 and 100.")
+            if not 0 <= template.png_compress_level <= 9:
+                raise ValidationError("PNG compression level must be between 0 and 9.")
+            if template.palette_colors and not 2 <= template.palette_colors <= 256:
+                raise ValidationError("Palette colors must be between 2 and 256, or 0 to disable.")
+            if template.output_dpi < 0 or template.output_max_dimension < 0:
+                raise ValidationError("Target DPI and max dimension cannot be negative.")
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        for vals in vals_list:
+            if 'file' in vals:
+                vals.update(self._prepare_file_values(vals['file']))
+        return super().create(vals_list)
+
+    def write(self, vals):
+        if 'file' in vals:
+            vals = dict(vals, **self._prepare_file_values(vals['file']))
+        res = super().write(vals)
+        self._invalidate_render_cache()
+        if 'file' in vals:
+            self._remove_editor_proxies()
+        return res
+
+    def unlink(self):
+        self._invalidate_render_cache()
+        return super().unlink()
+
+    @api.model
+    def _prepare_file_values(self, file):
+        """Validate an uploaded background and normalize it once for rendering"""
+        if not file:
+            return {
+                'render_file': False, 'image_width': 0, 'image_height': 0,
+                'image_mode': False, 'image_dpi': 0.0, 'image_checksum': False,
+            }
+        oversize = config.get('certificate_oversize_policy') or 'downscale'
+        try:
+            info, normalized = normalize_image(
+                base64.b64decode(file),
+                int(config.get('certificate_upload_max_dimension') or 0),
+                self._get_memory_budget(),
+                oversize if oversize in OVERSIZE_POLICIES else 'downscale',
+            )
+        except InvalidImage as e:
+            raise ValidationError(f"Invalid template file: {e}")
+        return {
+            'render_file': base64.b64encode(normalized) if normalized else False,
+            'image_width': info.width,
+            'image_height': info.height,
+            'image_mode': info.mode,
+            'image_dpi': info.dpi,
+            'image_checksum': info.checksum,
+        }
+
+    def _normalize_file(self):
+        """Normalize backgrounds uploaded before upload-time normalization.
+
+        Backgrounds that fail validation are logged and left as they are,
+        the render path still handles templates without ``image_width``.
+        """
+        for template in self.with_context(bin_size=False):
+            if template.file and not template.image_width:
+                try:
+                    values = template._prepare_file_values(template.file)
+                except ValidationError as e:
+                    _logger.warning(f"Template {template.id} background left unnormalized: {e}")
+                    continue
+                template.write(values)
 
     def action_open_visual_editor(self):
         """Open visual drag & drop editor"""
@@ -58,3 +298,536 @@ class SurveyCertificateTemplate(models.Model):
             'url': f'/certificate/editor/{self.id}',
             'target': 'new',
         }
+
+    # ------------------------------------------------------------
+    # EDITOR LAYOUT
+    # ------------------------------------------------------------
+
+    @api.model
+    def _validate_layout(self, layout):
+        """Check the shape of a layout posted by the visual editor"""
+        def is_number(value):
+            return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+        if not isinstance(layout, dict):
+            raise ValidationError("Layout must be an object.")
+        for key in ('canvas_width', 'canvas_height'):
+            if not is_number(layout.get(key)) or layout[key] <= 0:
+                raise ValidationError(f"Layout '{key}' must be a positive number.")
+        if 'scale' in layout and (not is_number(layout['scale']) or layout['scale'] <= 0):
+            raise ValidationError("Layout 'scale' must be a positive number.")
+        objects = layout.get('objects', [])
+        if not isinstance(objects, list):
+            raise ValidationError("Layout 'objects' must be a list.")
+
+        seen = set()
+        for obj in objects:
+            if not isinstance(obj, dict) or not isinstance(obj.get('id'), str) or not obj['id']:
+                raise ValidationError(f"Invalid layout object: {obj!r}")
+            if obj['id'] in seen:
+                raise ValidationError(f"Layout object '{obj['id']}' appears twice.")
+            seen.add(obj['id'])
+            for key in ('left', 'top'):
+                if not is_number(obj.get(key)):
+                    raise ValidationError(f"'{obj['id']}.{key}' must be a number.")
+            for key in ('width', 'height'):
+                if key in obj and (not is_number(obj[key]) or obj[key] < 0):
+                    raise ValidationError(f"'{obj['id']}.{key}' must be a number of at least 0.")
+            if 'fontSize' in obj and (not is_number(obj['fontSize']) or obj['fontSize'] <= 0):
+                raise ValidationError(f"'{obj['id']}.fontSize' must be a positive number.")
+            if obj['id'] in LAYOUT_IMAGE_IDS:
+                if 'width' not in obj or 'height' not in obj:
+                    raise ValidationError(f"'{obj['id']}' needs a width and a height.")
+                continue
+            field = obj.get('field', obj['id'])
+            if field not in LAYOUT_TEXT_FIELDS:
+                raise ValidationError(f"Unknown text field '{field}' for layout object '{obj['id']}'.")
+            if field == 'static' and not isinstance(obj.get('text'), str):
+                raise ValidationError(f"Static text '{obj['id']}' needs a text.")
+            if obj.get('align', 'center') not in ('left', 'center', 'right'):
+                raise ValidationError(f"'{obj['id']}.align' must be left, center or right.")
+            if 'fill' in obj and not (isinstance(obj['fill'], str) and HEX_COLOR.match(obj['fill'])):
+                raise ValidationError(f"'{obj['id']}.fill' must be a hex color.")
+
+    @api.model
+    def _get_layout_values(self, layout):
+        """Translate a full-resolution editor layout into template field values"""
+        values = {'layout_json': json.dumps(layout)}
+        objects = {obj['id']: obj for obj in layout.get('objects', [])}
+        canvas_width, canvas_height = layout['canvas_width'], layout['canvas_height']
+
+        name_obj = objects.get('name')
+        if name_obj:
+            values.update({
+                'name_position_y': int((name_obj['top'] / canvas_height) * 100),
+                'name_font_size': int(name_obj.get('fontSize', 60)),
+                'name_color': name_obj.get('fill', '#000000'),
+            })
+
+        date_obj = objects.get('date')
+        if date_obj and name_obj:
+            values.update({
+                'date_position_offset': int(date_obj['top'] - name_obj['top']),
+                'date_font_size': int(date_obj.get('fontSize', 30)),
+                'date_color': date_obj.get('fill', '#000000'),
+            })
+
+        logo_obj = objects.get('logo')
+        if logo_obj:
+            values.update({
+                'logo_position_x': int((logo_obj['left'] / canvas_width) * 100),
+                'logo_position_y': int((logo_obj['top'] / canvas_height) * 100),
+            })
+
+        sig_obj = objects.get('signature')
+        if sig_obj:
+            values.update({
+                'signature_position_x': int(((sig_obj['left'] + sig_obj['width'] / 2) / canvas_width) * 100),
+                'signature_position_y': int((sig_obj['top'] / canvas_height) * 100),
+            })
+        return values
+
+    def _save_editor_layout(self, layout, revision):
+        """Write only the fields the layout changes, in a single write.
+
+        :param revision: ``layout_revision`` the editor session started from
+        :return: the new revision, or False if another session saved first
+        """
+        self.ensure_one()
+        # Lock the row so two sessions cannot both pass the revision check
+        self.env.cr.execute(
+            "SELECT layout_revision FROM survey_certificate_template WHERE id = %s FOR UPDATE",
+            [self.id],
+        )
+        current = self.env.cr.fetchone()[0] or 0
+        if revision is not None and int(revision) != current:
+            return False
+        self.invalidate_recordset()
+
+        values = self._get_layout_values(layout)
+        changes = {
+            field_name: value
+            for field_name, value in values.items()
+            if field_name != 'layout_json' and self[field_name] != value
+        }
+        if layout != (json.loads(self.layout_json) if self.layout_json else None):
+            changes['layout_json'] = values['layout_json']
+        if not changes:
+            return current
+
+        changes['layout_revision'] = current + 1
+        self.write(changes)
+        return current + 1
+
+    # ------------------------------------------------------------
+    # EDITOR PROXIES
+    # ------------------------------------------------------------
+
+    def _remove_editor_proxies(self):
+        self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', 'in', self.ids),
+            ('name', '=like', f'{EDITOR_PROXY_PREFIX}%'),
+        ]).unlink()
+
+    def _get_editor_proxy(self, width):
+        """Return a downscaled background for the editor.
+
+        The requested width is snapped to ``EDITOR_PROXY_WIDTHS`` so only a
+        handful of renditions exist per background. Returns a dict with the
+        proxy ``attachment`` (False when the original is small enough), the
+        proxy and full-resolution sizes and ``scale`` (proxy / full).
+        """
+        self.ensure_one()
+        source = self._get_field_attachment('file')
+        if not source:
+            return False
+
+        target = next((w for w in EDITOR_PROXY_WIDTHS if w >= width), EDITOR_PROXY_WIDTHS[-1])
+        use_webp = features.check('webp')
+        extension = 'webp' if use_webp else 'jpg'
+        name = f"{EDITOR_PROXY_PREFIX}{target}_{source.checksum}.{extension}"
+        Attachment = self.env['ir.attachment'].sudo()
+        proxy = Attachment.search([
+            ('res_model', '=', self._name), ('res_id', '=', self.id), ('name', '=', name),
+        ], limit=1)
+
+        if proxy:
+            info = json.loads(proxy.description)
+        else:
+            img = self._open_attachment_image(source)
+            full_width, full_height = img.size
+            info = {'full_width': full_width, 'full_height': full_height}
+            if full_width <= target:
+                return dict(info, attachment=False, width=full_width, height=full_height, scale=1.0)
+
+            # Same decode as the render path: JPEG draft, flatten, then resize
+            img = decode_within_budget(img, scale=target / full_width)
+
+            output = BytesIO()
+            if use_webp:
+                img.save(output, format='WEBP', quality=80)
+            else:
+                img.save(output, format='JPEG', quality=85)
+            info.update(width=img.width, height=img.height)
+            proxy = Attachment.create({
+                'name': name,
+                'res_model': self._name,
+                'res_id': self.id,
+                'raw': output.getvalue(),
+                'mimetype': f'image/{"webp" if use_webp else "jpeg"}',
+                'description': json.dumps(info),
+            })
+
+        return dict(info, attachment=proxy, scale=info['width'] / info['full_width'])
+
+    # ------------------------------------------------------------
+    # RENDERING
+    # ------------------------------------------------------------
+
+    def _invalidate_render_cache(self):
+        ids = set(self.ids)
+        if ids:
+            _prepared_canvas_cache.invalidate(lambda key: key[0] in ids)
+            _preview_cache.invalidate(lambda key: key in ids)
+
+    @api.model
+    def _get_render_cache_stats(self):
+        """Hit/miss counters of the prepared canvas cache of this process"""
+        return _prepared_canvas_cache.stats()
+
+    @api.model
+    def _get_render_metrics(self):
+        """Counters, stage latency histograms and cache usage of this process"""
+        snapshot = metrics.snapshot()
+        snapshot['caches'] = {
+            'draw_plan': _prepared_canvas_cache.stats(),
+            'preview': _preview_cache.stats(),
+            'font': font_cache_stats(),
+            'asset': self.env['survey.certificate.asset']._get_rendition_cache_stats(),
+        }
+        return snapshot
+
+    def _get_font_source(self, bold=False):
+        """Return the ``tools.fonts.get_font`` source of this template's font"""
+        self.ensure_one()
+        if self.font_id:
+            return self.font_id._get_font_source(bold=bold)
+        extra_paths = tuple(p.strip() for p in (config.get('certificate_font_paths') or '').split(',') if p.strip())
+        return resolve_system_font(extra_paths, bold=bold)
+
+    def _make_text_op(self, field, bold, size, color, x, y, align='center', max_width=0, max_height=0, max_lines=1):
+        source = detach_font_source(self._get_font_source(bold=bold))
+        return TextOp(
+            field, get_font(source, size), source, size, color or '#000000', x, y, align,
+            int(max_width), int(max_height), max_lines,
+        )
+
+    @staticmethod
+    def _text_room(x, align, img_width):
+        """Widest text anchored at ``x`` that stays within the side margins"""
+        margin = img_width * TEXT_MARGIN
+        if align == 'left':
+            room = img_width - margin - x
+        elif align == 'right':
+            room = x - margin
+        else:
+            room = 2 * min(x - margin, img_width - margin - x)
+        return max(room, 1)
+
+    def _render_cache_key(self):
+        """Everything the compiled draw plan depends on"""
+        self.ensure_one()
+        return (
+            self.id, self.write_date, self.font_id.id, self.font_id.write_date,
+            self.logo_asset_id.checksum, self.signature_asset_id.checksum,
+        )
+
+    def _get_draw_plan(self):
+        """Return the compiled draw plan of the current template revision.
+
+        Plans are shared through a per-process cache and must not be
+        modified; ``execute_plan`` draws on a copy of the base.
+        """
+        self.ensure_one()
+        cache_size = int(config.get('certificate_render_cache_mb', DEFAULT_RENDER_CACHE_MB))
+        _prepared_canvas_cache.resize(cache_size * 1024 * 1024)
+
+        key = self._render_cache_key()
+        plan = _prepared_canvas_cache.get(key)
+        if plan is None:
+            plan = self._compile_draw_plan()
+            _prepared_canvas_cache.put(key, plan)
+        return plan
+
+    def _render_image(self, params):
+        """Draw the certificate described by ``params`` (a ``RenderParams``)"""
+        self.ensure_one()
+        plan = self._get_draw_plan()
+        with metrics.stage('text_layout'):
+            return execute_plan(plan, params)
+
+    def _get_output_format(self):
+        """PIL name of the output format"""
+        return (self.output_format or 'png').upper()
+
+    def _get_output_extension(self):
+        self.ensure_one()
+        return OUTPUT_FORMATS[self._get_output_format()][1]
+
+    def _get_output_encoding(self):
+        """Return ``(image_format, encode params)`` for ``tools.render.encode_image``"""
+        self.ensure_one()
+        image_format = self._get_output_format()
+        if image_format == 'PNG':
+            params = {'compress_level': self.png_compress_level, 'optimize': self.png_optimize}
+            if self.palette_colors:
+                params['colors'] = self.palette_colors
+        elif image_format == 'JPEG':
+            params = {'quality': self.output_quality, 'optimize': True}
+        else:
+            params = {'quality': self.output_quality, 'method': 4}
+        dpi = self._get_draw_plan().dpi
+        if dpi and image_format != 'WEBP':
+            params['dpi'] = tuple(round(d) for d in dpi)
+        return image_format, params
+
+    def _get_output_scale(self, size, dpi):
+        """Downscale factor (at most 1) meeting the target DPI and max dimension"""
+        factor = 1.0
+        if self.output_dpi and dpi and dpi[0] > self.output_dpi:
+            factor = self.output_dpi / dpi[0]
+        if self.output_max_dimension and max(size) * factor > self.output_max_dimension:
+            factor = self.output_max_dimension / max(size)
+        return factor
+
+    def _render_certificate(self, params, image_format=None, **encode_params):
+        """Return the encoded certificate for ``params``; needs no survey.user_input.
+
+        Uses the template output settings unless ``image_format`` is given.
+        """
+        self.ensure_one()
+        if image_format is None:
+            image_format, encode_params = self._get_output_encoding()
+        if self._get_memory_budget():
+            plan = self._get_draw_plan()
+            output = BytesIO()
+            # Drawing and encoding happen together on the base, timed as encode
+            with metrics.stage('encode'):
+                render_certificate_to(plan, params, output, image_format, **encode_params)
+            data = output.getvalue()
+        else:
+            img = self._render_image(params)
+            with metrics.stage('encode'):
+                data = encode_image(img, image_format, **encode_params)
+        metrics.inc('certificates_rendered')
+        return data
+
+    @api.model
+    def _get_memory_budget(self):
+        """Bytes a decoded background may use, 0 when memory budget mode is off"""
+        return int(config.get('certificate_render_memory_mb') or 0) * 1024 * 1024
+
+    def _render_preview(self, params):
+        """Like ``_render_certificate`` but remembers the last preview of each template"""
+        self.ensure_one()
+        key = (self._render_cache_key(), params)
+        cached = _preview_cache.get(self.id)
+        if cached and cached[0] == key:
+            return cached[1]
+        data = self._render_certificate(params)
+        _preview_cache.put(self.id, (key, data))
+        return data
+
+    def _get_pdf_dpi(self):
+        """Resolution used to size PDF pages, taken from the background image"""
+        self.ensure_one()
+        dpi = self._get_draw_plan().dpi
+        return float(dpi[0]) if dpi and dpi[0] > 1 else DEFAULT_DPI
+
+    def _compile_draw_plan(self):
+        """Decode the background, composite every static element and resolve
+        fonts and anchors of the participant-dependent texts."""
+        self.ensure_one()
+        _logger.info(f"Compiling certificate draw plan for template: {self.name}")
+        metrics.inc('draw_plans_compiled')
+
+        with metrics.stage('template_decode'):
+            # Normalized uploads are render-ready RGB and carry their metadata;
+            # positions and pixel sizes stay relative to the uploaded size
+            render_file = self._get_field_attachment('render_file') if self.image_width else None
+            if render_file:
+                source = self._open_attachment_image(render_file)
+            else:
+                source = self._decode_binary_image('file')
+            if self.image_width:
+                full_size = (self.image_width, self.image_height)
+                dpi = (self.image_dpi, self.image_dpi) if self.image_dpi else None
+            else:
+                full_size = source.size
+                dpi = source.info.get('dpi')
+            full_width = full_size[0]
+            oversize = config.get('certificate_oversize_policy') or 'downscale'
+            if oversize not in OVERSIZE_POLICIES:
+                oversize = 'downscale'
+            scale = self._get_output_scale(full_size, dpi)
+            try:
+                base = decode_within_budget(
+                    source, self._get_memory_budget(), min(scale * full_width / source.width, 1.0), oversize,
+                )
+            except ImageTooLarge as e:
+                raise UserError(f"Certificate template '{self.name}' is too large to render: {e}")
+            expected_width = min(scale * full_width, source.width)
+            del source
+            factor = base.width / full_width
+            if base.width < expected_width * 0.99:
+                _logger.warning(f"Template {self.name} downscaled to {base.width}x{base.height} to fit the render memory budget")
+            if factor < 1 and dpi:
+                dpi = (dpi[0] * factor, dpi[1] * factor)
+
+        with metrics.stage('composite'):
+            layout = json.loads(self.layout_json) if self.layout_json else None
+            if layout and layout.get('objects'):
+                texts = self._compile_layout(base, layout, factor)
+            else:
+                texts = self._compile_legacy_fields(base, factor)
+            qr = None
+            if self.show_verification_qr:
+                qr, serial_op = self._compile_verification(base, factor)
+                texts.append(serial_op)
+        return DrawPlan(base, tuple(texts), dpi, qr)
+
+    def _compile_verification(self, base, factor=1.0):
+        """Place the verification QR code and the serial printed below it"""
+        img_width, img_height = base.size
+        size = min(max(int(self.verification_qr_size * factor), 16), img_width, img_height)
+        x = min(max(int(img_width * self.verification_qr_x / 100), 0), img_width - size)
+        y = min(max(int(img_height * self.verification_qr_y / 100), 0), img_height - size)
+        qr = None
+        if qr_available():
+            qr = QrOp(f"{self.get_base_url()}/certificate/verify/", x, y, size)
+        else:
+            _logger.warning("The qrcode library is not installed, certificates show the serial without QR code")
+        serial_op = self._make_text_op(
+            'serial', False, max(size // 10, 8), '#000000', x + size / 2, y + size + max(size // 20, 2),
+            max_width=self._text_room(x + size / 2, 'center', img_width),
+        )
+        return qr, serial_op
+
+    def _compile_layout(self, base, layout, factor=1.0):
+        """Compile the editor layout, scaled from editor canvas to image pixels.
+
+        ``factor`` is the output downscale, applied to the pixel sizes that
+        are not part of the layout (signature label). Logo, signature and
+        date objects are skipped when their ``show_*`` toggle is off.
+        """
+        img_width, img_height = base.size
+        scale_x = img_width / layout['canvas_width']
+        scale_y = img_height / layout['canvas_height']
+        draw = ImageDraw.Draw(base)
+        texts = []
+        hidden = {
+            'logo': not self.show_logo,
+            'signature': not self.show_signature,
+            'date_str': not self.show_date,
+        }
+
+        for obj in layout['objects']:
+            if obj['id'] in LAYOUT_IMAGE_IDS:
+                if hidden[obj['id']]:
+                    continue
+            elif hidden.get(LAYOUT_TEXT_FIELDS[obj.get('field', obj['id'])]):
+                continue
+            left, top = obj['left'] * scale_x, obj['top'] * scale_y
+            width, height = obj.get('width', 0) * scale_x, obj.get('height', 0) * scale_y
+
+            if obj['id'] in LAYOUT_IMAGE_IDS:
+                asset = self.logo_asset_id if obj['id'] == 'logo' else self.signature_asset_id
+                if not asset:
+                    continue
+                try:
+                    paste_scaled(base, asset._get_rendition(width, height), (left, top, width, height))
+                    if obj['id'] == 'signature' and self.signature_label:
+                        label = self._make_text_op(
+                            'static', False, max(int(self.date_font_size * factor), 1), '#000000',
+                            left + width / 2, top + height + 10 * factor, max_width=width, max_lines=2,
+                        )
+                        draw_op(draw, label, self.signature_label)
+                except Exception as e:
+                    _logger.error(f"Error adding {obj['id']}: {e}")
+                continue
+
+            field = LAYOUT_TEXT_FIELDS[obj.get('field', obj['id'])]
+            size = max(int(obj.get('fontSize', 30) * scale_y), 1)
+            bold = obj.get('fontWeight') == 'bold'
+            align = obj.get('align', 'center')
+            x = {'left': left, 'right': left + width}.get(align, left + width / 2)
+            if field == 'static':
+                op = self._make_text_op(field, bold, size, obj.get('fill'), x, top, align)
+                draw_op(draw, op, obj.get('text', ''))
+            else:
+                texts.append(self._make_text_op(
+                    field, bold, size, obj.get('fill'), x, top, align,
+                    max_width=self._text_room(x, align, img_width),
+                ))
+        return texts
+
+    def _compile_legacy_fields(self, base, factor=1.0):
+        """Compile the per-element fields, for templates never saved from the editor.
+
+        Widths, font sizes and offsets are configured in background pixels
+        and scaled by ``factor`` when the output is downscaled.
+        """
+        img_width, img_height = base.size
+        texts = []
+
+        def px(value):
+            return max(int(value * factor), 1)
+
+        # === TAMBAHKAN LOGO ===
+        if self.show_logo and self.logo_asset_id:
+            try:
+                logo = self.logo_asset_id
+                logo_width = px(self.logo_width)
+                logo_height = int(logo.height * (logo_width / logo.width))
+                logo_x = int(img_width * (self.logo_position_x / 100))
+                logo_y = int(img_height * (self.logo_position_y / 100))
+                paste_scaled(base, logo._get_rendition(logo_width, logo_height), (logo_x, logo_y, logo_width, logo_height))
+            except Exception as e:
+                _logger.error(f"Error adding logo: {e}")
+
+        # === TAMBAHKAN SIGNATURE ===
+        if self.show_signature and self.signature_asset_id:
+            try:
+                signature = self.signature_asset_id
+                sig_width = px(self.signature_width)
+                sig_height = int(signature.height * (sig_width / signature.width))
+                sig_x = int(img_width * (self.signature_position_x / 100)) - (sig_width // 2)
+                sig_y = int(img_height * (self.signature_position_y / 100))
+                paste_scaled(base, signature._get_rendition(sig_width, sig_height), (sig_x, sig_y, sig_width, sig_height))
+
+                if self.signature_label:
+                    label = self._make_text_op(
+                        'static', False, px(self.date_font_size), '#000000',
+                        sig_x + sig_width // 2, sig_y + sig_height + px(10), max_width=sig_width, max_lines=2,
+                    )
+                    draw_op(ImageDraw.Draw(base), label, self.signature_label)
+            except Exception as e:
+                _logger.error(f"Error adding signature: {e}")
+
+        # === NAMA & TANGGAL ===
+        # Long names shrink, wrapping onto a second line above the date
+        name_y = int(img_height * (self.name_position_y / 100))
+        name_size = px(self.name_font_size)
+        room = self._text_room(img_width // 2, 'center', img_width)
+        date_offset = int(self.date_position_offset * factor)
+        texts.append(self._make_text_op(
+            'name', True, name_size, self.name_color, img_width // 2, name_y,
+            max_width=room, max_height=max(date_offset, int(name_size * 1.25)) if self.show_date else 0, max_lines=2,
+        ))
+        if self.show_date:
+            texts.append(self._make_text_op(
+                'date_str', False, px(self.date_font_size), self.date_color,
+                img_width // 2, name_y + date_offset, max_width=room,
+            ))
+        return texts
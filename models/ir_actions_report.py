@@ -0,0 +1,16 @@
+from odoo import models
+
+
+class IrActionsReport(models.Model):
+    _inherit = 'ir.actions.report'
+
+    def _render_qweb_pdf(self, report_ref, res_ids=None, data=None):
+        """Build custom-template certificates natively instead of through wkhtmltopdf"""
+        report = self._get_report(report_ref)
+        if res_ids and report == self.env.ref('survey.certification_report', raise_if_not_found=False):
+            if isinstance(res_ids, int):
+                res_ids = [res_ids]
+            user_inputs = self.env['survey.user_input'].browse(res_ids)
+            if all(user_input.survey_id.certificate_template_id._has_background() for user_input in user_inputs):
+                return user_inputs._render_certificate_pdf(), 'pdf'
+        return super()._render_qweb_pdf(report_ref, res_ids=res_ids, data=data)
@@ -1,11 +1,25 @@
 from odoo import models, fields, api
+from odoo.exceptions import UserError
+from odoo.osv import expression
+from odoo.tools import config
 import base64
-from io import BytesIO
-from PIL import Image, ImageDraw, ImageFont
+import hashlib
 import logging
+from markupsafe import Markup
+from werkzeug.utils import secure_filename
+
+from ..tools.bulk import iter_zip, render_many
+from ..tools.metrics import metrics
+from ..tools.pdf import encode_page_image, iter_image_pdf, iter_pdf
+from ..tools.render import RenderParams, format_certificate_date
 
 _logger = logging.getLogger(__name__)
 
+CERTIFICATE_ATTACHMENT_PREFIX = 'survey_certificate_'
+# Exports missing more certificates (``certificate_bulk_sync_limit`` in
+# odoo.conf) are rendered by the render queue instead of inside the request
+DEFAULT_BULK_SYNC_LIMIT = 200
+
 class SurveySurvey(models.Model):
     _inherit = 'survey.survey'
 
@@ -14,6 +28,31 @@ class SurveySurvey(models.Model):
         string='Certificate Template',
         help='Select certificate template for this survey'
     )
+    name_question_id = fields.Many2one(
+        'survey.question',
+        string='Participant Name Question',
+        domain="[('survey_id', '=', id), ('question_type', 'in', ['char_box', 'text_box'])]",
+        help="Answer printed as participant name on the certificate. When empty, the first "
+             "question whose title contains 'name' or 'nama' is used."
+    )
+    certificate_export_user_id = fields.Many2one(
+        'res.users',
+        string='Certificate Export Requested By',
+        readonly=True,
+        copy=False,
+        help="Set while the certificates of a requested export are rendered in the background; "
+             "the user is notified when they are done."
+    )
+
+    def _get_name_question(self):
+        """Question holding the participant name, if any"""
+        self.ensure_one()
+        if self.name_question_id:
+            return self.name_question_id
+        # Cari question yang judulnya mengandung 'nama' atau 'name'
+        return self.question_ids.filtered(
+            lambda q: 'nama' in (q.title or '').lower() or 'name' in (q.title or '').lower()
+        )[:1]
 
     def action_survey_preview_certification_template(self):
         """Override preview button to open in new tab without download"""
@@ -28,6 +67,173 @@ class SurveySurvey(models.Model):
         else:
             return super().action_survey_preview_certification_template()
 
+    def action_generate_certificates(self):
+        """Download the certificates of all passed participants as a ZIP"""
+        return self._action_export_certificates('zip')
+
+    def action_print_certificates_pdf(self):
+        """Download all certificates as one multi-page PDF"""
+        return self._action_export_certificates('pdf')
+
+    def _action_export_certificates(self, kind):
+        """Open the ``kind`` export once every certificate is stored, or tell
+        the user the export continues in the background"""
+        self.ensure_one()
+        user_inputs = self._get_certificate_user_inputs()
+        if not user_inputs:
+            raise UserError("No passed participants to generate certificates for.")
+        if self._prepare_certificate_export(user_inputs) is None:
+            return {
+                'type': 'ir.actions.client',
+                'tag': 'display_notification',
+                'params': {
+                    'title': "Generating certificates",
+                    'message': f"{len(user_inputs)} certificates are generated in the background. "
+                               "You will be notified on this survey when they are ready.",
+                    'type': 'info',
+                    'sticky': False,
+                },
+            }
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f'/survey/certificate/{kind}/{self.id}',
+            'target': 'self' if kind == 'zip' else 'new',
+        }
+
+    def _get_certificate_user_inputs(self, domain=None):
+        """Passed, non-test participations of this survey"""
+        self.ensure_one()
+        return self.env['survey.user_input'].search(expression.AND([
+            [('survey_id', '=', self.id), ('scoring_success', '=', True), ('test_entry', '=', False)],
+            domain or [],
+        ]))
+
+    def _find_certificate_renditions(self, user_inputs):
+        """Return ``(params, attachment names, stored attachments, participations
+        without stored certificate)`` for ``user_inputs``, all keyed by user_input id"""
+        template = self.certificate_template_id
+        if not template._has_background():
+            raise UserError("This survey has no certificate template.")
+        params = user_inputs._get_certificate_render_params()
+        attachment_names = {
+            user_input.id: user_input._certificate_attachment_name(template, params[user_input.id])
+            for user_input in user_inputs
+        }
+        stored = user_inputs._find_stored_certificates(attachment_names)
+        stored_ids = set(stored.mapped('res_id'))
+        return params, attachment_names, stored, user_inputs.filtered(lambda ui: ui.id not in stored_ids)
+
+    def _generate_certificates_bulk(self, domain=None):
+        """Render and store the certificates of the passed participants that
+        have no stored copy yet.
+
+        :param domain: optional extra domain on ``survey.user_input``
+        :return: the stored certificates of all those participants, one
+            attachment per user_input in the template output format
+        """
+        self.ensure_one()
+        user_inputs = self._get_certificate_user_inputs(domain)
+        if not user_inputs:
+            return self.env['ir.attachment']
+        params, attachment_names, stored, missing = self._find_certificate_renditions(user_inputs)
+        return stored | self._render_certificate_attachments(missing, params, attachment_names)
+
+    def _render_certificate_attachments(self, user_inputs, params, attachment_names):
+        """Render ``user_inputs`` in this process and store them, 100 at a time"""
+        template = self.certificate_template_id
+        Attachment = self.env['ir.attachment']
+        if not user_inputs:
+            return Attachment
+        _logger.info(f"Rendering {len(user_inputs)} certificates for survey {self.id}")
+        image_format, encode_params = template._get_output_encoding()
+        jobs = [(user_input.id, params[user_input.id]) for user_input in user_inputs]
+        rendered = render_many(template._get_draw_plan(), jobs, image_format=image_format, **encode_params)
+
+        UserInput = self.env['survey.user_input']
+        stored, batch = Attachment, []
+        for user_input_id, data in rendered:
+            batch.append((user_input_id, attachment_names[user_input_id], data))
+            if len(batch) >= 100:
+                stored |= UserInput._store_certificates(batch, template.output_mimetype)
+                batch = []
+        if batch:
+            stored |= UserInput._store_certificates(batch, template.output_mimetype)
+        metrics.inc('certificates_rendered_bulk', len(jobs))
+        return stored
+
+    def _prepare_certificate_export(self, user_inputs):
+        """Make sure every certificate of ``user_inputs`` is stored, for a ZIP or PDF export.
+
+        Up to ``certificate_bulk_sync_limit`` missing certificates are rendered
+        right away. More, or participations without serial yet, go to the
+        render queue and the requesting user is notified on the survey when
+        they are done; None is returned then.
+
+        :return: ``[(RenderParams, attachment)]`` in the order of ``user_inputs``
+        """
+        self.ensure_one()
+        params, attachment_names, stored, missing = self._find_certificate_renditions(user_inputs)
+        limit = int(config.get('certificate_bulk_sync_limit') or DEFAULT_BULK_SYNC_LIMIT)
+        if len(missing) > limit or any(not params[user_input.id].serial for user_input in missing):
+            if not self.certificate_export_user_id:
+                self.sudo().certificate_export_user_id = self.env.user
+            self.env['survey.certificate.render.job'].sudo()._enqueue(missing)
+            return None
+        stored |= self._render_certificate_attachments(missing, params, attachment_names)
+        attachment_of = {attachment.res_id: attachment for attachment in stored}
+        return [(params[user_input.id], attachment_of[user_input.id]) for user_input in user_inputs if user_input.id in attachment_of]
+
+    @api.model
+    def _cron_export_certificates(self):
+        """Notify the users whose background certificate export is rendered"""
+        Job = self.env['survey.certificate.render.job'].sudo()
+        for survey in self.search([('certificate_export_user_id', '!=', False)]):
+            if not Job.search_count([('survey_id', '=', survey.id), ('state', '=', 'pending')], limit=1):
+                survey._notify_certificate_export()
+
+    def _notify_certificate_export(self):
+        """Post the export links for the user who asked for them"""
+        self.ensure_one()
+        partner = self.certificate_export_user_id.partner_id
+        self.certificate_export_user_id = False
+        failed = self.env['survey.certificate.render.job'].sudo().search_count([
+            ('survey_id', '=', self.id), ('state', '=', 'failed'),
+        ])
+        body = Markup(
+            "Certificates are ready: <a href='/survey/certificate/zip/%s'>download ZIP</a>, "
+            "<a href='/survey/certificate/pdf/%s' target='_blank'>print PDF</a>."
+        ) % (self.id, self.id)
+        if failed:
+            body += Markup(" %s certificate(s) could not be rendered, see the render jobs.") % failed
+        self.message_post(body=body, partner_ids=partner.ids, subtype_xmlid='mail.mt_note')
+
+    def _iter_certificates_zip(self, exported):
+        """Return an iterator of ZIP chunks of ``_prepare_certificate_export`` results.
+
+        Files are read from the filestore one at a time while the iterator is
+        consumed, after every ORM access.
+        """
+        def filename(params, attachment):
+            extension = attachment.name.rsplit('.', 1)[-1]
+            return f"certificate_{attachment.res_id}_{secure_filename(params.name) or 'participant'}.{extension}"
+
+        return iter_zip([(filename(params, attachment), self._attachment_source(attachment)) for params, attachment in exported])
+
+    def _iter_certificates_pdf(self, exported):
+        """Return an iterator of PDF chunks, one page per ``_prepare_certificate_export`` result.
+
+        Like ``_iter_certificates_zip``, pages are read from the filestore
+        while the iterator is consumed.
+        """
+        dpi = self.certificate_template_id._get_pdf_dpi()
+        return iter_image_pdf([self._attachment_source(attachment) for __, attachment in exported], dpi)
+
+    @api.model
+    def _attachment_source(self, attachment):
+        """Filestore path of an attachment, or its bytes when stored in the database"""
+        attachment = attachment.sudo()
+        return attachment._full_path(attachment.store_fname) if attachment.store_fname else attachment.raw
+
 
 class SurveyUserInput(models.Model):
     _inherit = 'survey.user_input'
@@ -38,207 +244,258 @@ class SurveyUserInput(models.Model):
         store=False
     )
 
-    @api.depends('survey_id.certificate_template_id', 'partner_id', 'email')
+    @api.depends(
+        'survey_id.certificate_template_id', 'partner_id', 'email',
+        'user_input_line_ids.value_char_box', 'user_input_line_ids.value_text_box',
+    )
     def _compute_certification_report_image(self):
-        """Compute certification report image"""
-        for record in self:
-            if record.survey_id.certificate_template_id:
-                _logger.info(f"=== Computing CUSTOM certificate for user_input {record.id} ===")
-                record.certification_report_image = record._generate_custom_certificate()
-            else:
-                try:
-                    super(SurveyUserInput, record)._compute_certification_report_image()
-                except:
-                    record.certification_report_image = False
+        """Compute certification report image.
 
-    def _get_participant_name_from_answers(self):
-        """Get participant name from survey answers if available"""
-        self.ensure_one()
-        
-        _logger.info(f"=== Getting participant name for user_input {self.id} ===")
-        _logger.info(f"Survey: {self.survey_id.title}")
-        _logger.info(f"Total questions: {len(self.survey_id.question_ids)}")
-        _logger.info(f"Total answers: {len(self.user_input_line_ids)}")
-        
-        # Log all questions
-        for question in self.survey_id.question_ids:
-            _logger.info(f"Question ID {question.id}: '{question.title}' (type: {question.question_type})")
-        
-        # Log all answers
-        for answer in self.user_input_line_ids:
-            _logger.info(f"Answer for Q{answer.question_id.id}: value_text_box='{answer.value_text_box}', value_char_box='{answer.value_char_box}'")
-        
-        # Cari question yang judulnya mengandung 'nama' atau 'name'
-        name_questions = self.survey_id.question_ids.filtered(
-            lambda q: 'nama' in q.title.lower() or 'name' in q.title.lower()
+        Custom certificates are computed for the whole recordset at once,
+        grouped by template; the other records go to the standard compute
+        together.
+        """
+        custom = self.filtered(lambda record: record.survey_id.certificate_template_id)
+        others = self - custom
+        if others:
+            try:
+                super(SurveyUserInput, others)._compute_certification_report_image()
+            except Exception:
+                others.certification_report_image = False
+        if custom:
+            _logger.debug(f"=== Computing CUSTOM certificates for user_inputs {custom.ids} ===")
+            data = custom._get_certificates_data()
+            for record in custom:
+                record.certification_report_image = base64.b64encode(data[record.id]) if data[record.id] else False
+
+    def _mark_done(self):
+        """Issue the certificate serial and queue the render as soon as the
+        participation is done"""
+        res = super()._mark_done()
+        to_render = self.filtered(
+            lambda ui: ui.scoring_success and not ui.test_entry and ui.survey_id.certificate_template_id._has_background()
         )
-        
-        _logger.info(f"Found {len(name_questions)} name-related questions")
-        
-        if name_questions:
-            name_question = name_questions[0]
-            _logger.info(f"Using question: '{name_question.title}' (ID: {name_question.id})")
-            
-            # Cari answer untuk question ini
-            answer = self.user_input_line_ids.filtered(
-                lambda line: line.question_id.id == name_question.id
+        to_render._issue_certificates()
+        self.env['survey.certificate.render.job'].sudo()._enqueue(to_render)
+        return res
+
+    def _get_participant_names(self):
+        """Return {user_input id: participant name} for the whole recordset.
+
+        The name question is resolved once per survey and all matching answer
+        lines are fetched in a single query.
+        """
+        with metrics.stage('name_lookup'):
+            return self._resolve_participant_names()
+
+    def _resolve_participant_names(self):
+        name_questions = {survey.id: survey._get_name_question().id for survey in self.survey_id}
+        survey_of_input = {record.id: record.survey_id.id for record in self}
+
+        answers = {}
+        question_ids = [question_id for question_id in name_questions.values() if question_id]
+        if question_ids:
+            Line = self.env['survey.user_input.line']
+            value_fields = [f for f in ('value_text_box', 'value_char_box', 'value_text') if f in Line._fields]
+            lines = Line.sudo().search_read(
+                [('user_input_id', 'in', self.ids), ('question_id', 'in', question_ids)],
+                ['user_input_id', 'question_id'] + value_fields,
             )
-            
-            _logger.info(f"Found {len(answer)} answers for this question")
-            
-            if answer:
-                # Cek berbagai field yang mungkin berisi jawaban
-                if answer.value_text_box:
-                    _logger.info(f"✓ Found name in value_text_box: '{answer.value_text_box}'")
-                    return answer.value_text_box
-                elif answer.value_char_box:
-                    _logger.info(f"✓ Found name in value_char_box: '{answer.value_char_box}'")
-                    return answer.value_char_box
-                elif hasattr(answer, 'value_text') and answer.value_text:
-                    _logger.info(f"✓ Found name in value_text: '{answer.value_text}'")
-                    return answer.value_text
-                else:
-                    _logger.warning(f"Answer found but no value in any field!")
-        
+            for line in lines:
+                user_input_id = line['user_input_id'][0]
+                if user_input_id in answers or line['question_id'][0] != name_questions[survey_of_input[user_input_id]]:
+                    continue
+                value = next((line[f] for f in value_fields if line[f]), None)
+                if value:
+                    answers[user_input_id] = value
+
+        _logger.debug(f"Participant names: {len(answers)} of {len(self)} from answers to name questions {question_ids}")
         # Fallback ke partner name atau email
-        fallback_name = self.partner_id.name if self.partner_id else self.email or "Participant"
-        _logger.info(f"Using fallback name: '{fallback_name}'")
-        return fallback_name
+        return {
+            record.id: answers.get(record.id) or record.partner_id.name or record.email or "Participant"
+            for record in self
+        }
 
-    def _generate_custom_certificate(self):
-        """Generate custom certificate with configurable positions"""
+    def _get_certificate_date_str(self):
+        return format_certificate_date(fields.Date.today())
+
+    def _get_certificate_score(self):
         self.ensure_one()
-        
-        template = self.survey_id.certificate_template_id
-        
-        if not template or not template.file:
-            return False
-        
+        if self.survey_id.scoring_type == 'no_scoring':
+            return ''
+        return f"{round(self.scoring_percentage, 2):g}%"
+
+    def _get_certificate_render_params(self):
+        """Return {user_input id: RenderParams} for the whole recordset.
+
+        Participations with a ``survey.certificate.issue`` print its snapshot,
+        so the certificate always states what the verification page shows.
+        Others print live data without serial until one is issued.
+        """
+        issues = {
+            issue.user_input_id.id: issue
+            for issue in self.env['survey.certificate.issue'].sudo().search([('user_input_id', 'in', self.ids)])
+        }
+        live = self.filtered(lambda record: record.id not in issues)
+        names = live._get_participant_names() if live else {}
+        date_str = self._get_certificate_date_str()
+        params = {}
+        for record in self:
+            issue = issues.get(record.id)
+            if issue:
+                params[record.id] = RenderParams(
+                    name=issue.participant_name or '',
+                    date_str=format_certificate_date(issue.issue_date),
+                    survey_title=issue.survey_title or '',
+                    score=issue.score or '',
+                    serial=issue.serial,
+                )
+            else:
+                params[record.id] = RenderParams(
+                    name=names[record.id],
+                    date_str=date_str,
+                    survey_title=record.survey_id.title or '',
+                    score=record._get_certificate_score(),
+                )
+        return params
+
+    def _issue_certificates(self):
+        """Issue a serial to every passed participation of the recordset that
+        has none yet, with a snapshot of what its certificate states.
+
+        Called when a participation is done and by the render queue, never
+        while reading a certificate. Returns the created issues.
+        """
+        Issue = self.env['survey.certificate.issue'].sudo()
+        issued = Issue.search([('user_input_id', 'in', self.ids)]).user_input_id
+        to_issue = self.filtered(lambda ui: ui.scoring_success and not ui.test_entry and ui not in issued)
+        if not to_issue:
+            return Issue
+        names = to_issue._get_participant_names()
         try:
-            _logger.info(f"Generating custom certificate using template: {template.name}")
-            
-            # Decode template
-            template_data = base64.b64decode(template.file)
-            img = Image.open(BytesIO(template_data))
-            
-            # Convert mode
-            if img.mode == 'RGBA':
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                background.paste(img, mask=img.split()[3])
-                img = background
-            elif img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            draw = ImageDraw.Draw(img)
-            img_width, img_height = img.size
-            
-            # === TAMBAHKAN LOGO ===
-            if template.show_logo and template.logo_image:
+            with self.env.cr.savepoint():
+                return Issue.create([{
+                    'user_input_id': record.id,
+                    'participant_name': names[record.id],
+                    'survey_title': record.survey_id.title or '',
+                    'score': record._get_certificate_score(),
+                } for record in to_issue])
+        except Exception as e:
+            _logger.warning(f"Could not issue certificate serials: {e}")
+            return Issue
+
+    def _certificate_attachment_name(self, template, params):
+        """Content address of a rendered certificate: same inputs, same name"""
+        key = repr((template._render_cache_key(), tuple(params))).encode()
+        return f"{CERTIFICATE_ATTACHMENT_PREFIX}{hashlib.sha256(key).hexdigest()}.{template._get_output_extension()}"
+
+    def _find_stored_certificates(self, attachment_names):
+        """Return the stored certificates matching {user_input id: attachment name}"""
+        if not attachment_names:
+            return self.env['ir.attachment']
+        attachments = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', 'in', list(attachment_names)),
+            ('name', 'in', list(set(attachment_names.values()))),
+        ])
+        return attachments.filtered(lambda a: attachment_names.get(a.res_id) == a.name)
+
+    @api.model
+    def _store_certificates(self, rendered, mimetype='image/png'):
+        """Store ``(user_input id, attachment name, image bytes)`` triples.
+
+        Previous renditions of the same participations are removed. Reads can
+        happen in a read-only transaction, in which case nothing is stored and
+        the next read renders again.
+        """
+        Attachment = self.env['ir.attachment'].sudo()
+        try:
+            with self.env.cr.savepoint():
+                user_input_ids = [user_input_id for user_input_id, __, __ in rendered]
+                Attachment.search([
+                    ('res_model', '=', self._name),
+                    ('res_id', 'in', user_input_ids),
+                    ('name', '=like', f'{CERTIFICATE_ATTACHMENT_PREFIX}%'),
+                ]).unlink()
+                attachments = Attachment.create([{
+                    'name': name,
+                    'res_model': self._name,
+                    'res_id': user_input_id,
+                    'raw': data,
+                    'mimetype': mimetype,
+                } for user_input_id, name, data in rendered])
+                self.env['survey.certificate.issue']._record_content(rendered)
+                return attachments
+        except Exception as e:
+            _logger.warning(f"Could not store rendered certificates: {e}")
+            return Attachment
+
+    def _render_certificate_pdf(self):
+        """Render the custom certificates of the recordset as one PDF, one page each"""
+        params = self._get_certificate_render_params()
+
+        def pages():
+            for record in self:
+                template = record.survey_id.certificate_template_id
+                img = template._render_image(params[record.id])
+                yield encode_page_image(img)[0], img.size, 'DCTDecode', img.mode, template._get_pdf_dpi()
+
+        return b''.join(iter_pdf(pages()))
+
+    def _get_certificates_data(self):
+        """Return {user_input id: encoded certificate bytes, or False} for the recordset.
+
+        Participations, partners, names and stored renditions are read for
+        the whole recordset in a few queries, and each distinct template is
+        prepared once for all its participations.
+        """
+        result = dict.fromkeys(self.ids, False)
+        self.fetch(['survey_id', 'partner_id', 'email', 'scoring_percentage'])
+        self.partner_id.fetch(['name'])
+        templates = self.survey_id.certificate_template_id.with_context(bin_size=True)
+        records = self.filtered(lambda record: record.survey_id.certificate_template_id in templates.filtered('file'))
+        if not records:
+            return result
+
+        params = records._get_certificate_render_params()
+        attachment_names = {
+            record.id: record._certificate_attachment_name(record.survey_id.certificate_template_id, params[record.id])
+            for record in records
+        }
+        stored = records._find_stored_certificates(attachment_names)
+        for attachment in stored:
+            result[attachment.res_id] = attachment.raw
+        if stored:
+            metrics.inc('certificates_served_from_storage', len(stored))
+
+        todo = records.filtered(lambda record: not result[record.id])
+        for template in todo.survey_id.certificate_template_id:
+            _logger.debug(f"Generating custom certificates using template: {template.name}")
+            group = todo.filtered(lambda r: r.survey_id.certificate_template_id == template)
+            # Compile once up front: a template that cannot be compiled caches
+            # nothing and would be decoded again for every participation
+            try:
+                template._get_draw_plan()
+            except Exception as e:
+                metrics.inc('render_errors', len(group))
+                _logger.error(f"Error preparing certificate template {template.id} for {len(group)} participation(s): {e}", exc_info=True)
+                continue
+            rendered = []
+            for record in group:
                 try:
-                    logo_data = base64.b64decode(template.logo_image)
-                    logo = Image.open(BytesIO(logo_data))
-                    
-                    logo_width = template.logo_width
-                    logo_height = int(logo.height * (logo_width / logo.width))
-                    logo = logo.resize((logo_width, logo_height), Image.Resampling.LANCZOS)
-                    
-                    logo_x = int(img_width * (template.logo_position_x / 100))
-                    logo_y = int(img_height * (template.logo_position_y / 100))
-                    
-                    if logo.mode == 'RGBA':
-                        img.paste(logo, (logo_x, logo_y), logo)
-                    else:
-                        img.paste(logo, (logo_x, logo_y))
-                        
-                    _logger.info(f"Logo added at ({logo_x}, {logo_y})")
+                    data = template._render_certificate(params[record.id])
                 except Exception as e:
-                    _logger.error(f"Error adding logo: {e}")
-            
-            # === TULIS NAMA - AMBIL DARI SURVEY ANSWER ===
-            partner_name = self._get_participant_name_from_answers()
-            _logger.info(f">>> FINAL NAME TO PRINT: '{partner_name}' <<<")
-            
-            # Load font
-            font_name = None
-            font_date = None
-            
-            font_paths = [
-                "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
-                "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
-            ]
-            
-            for font_path in font_paths:
-                try:
-                    font_name = ImageFont.truetype(font_path, template.name_font_size)
-                    font_date = ImageFont.truetype(font_path.replace("-Bold", ""), template.date_font_size)
-                    break
-                except:
+                    metrics.inc('render_errors')
+                    _logger.error(f"Error generating custom certificate for user_input {record.id}: {e}", exc_info=True)
                     continue
-            
-            if not font_name:
-                font_name = ImageFont.load_default()
-                font_date = ImageFont.load_default()
-            
-            # Posisi nama
-            name_bbox = draw.textbbox((0, 0), partner_name, font=font_name)
-            name_width = name_bbox[2] - name_bbox[0]
-            name_x = (img_width - name_width) // 2
-            name_y = int(img_height * (template.name_position_y / 100))
-            
-            draw.text((name_x, name_y), partner_name, fill=template.name_color, font=font_name)
-            _logger.info(f"Name '{partner_name}' printed at ({name_x}, {name_y})")
-            
-            # === TULIS TANGGAL ===
-            if template.show_date:
-                completion_date = fields.Date.today().strftime("%B %d, %Y")
-                date_bbox = draw.textbbox((0, 0), completion_date, font=font_date)
-                date_width = date_bbox[2] - date_bbox[0]
-                date_x = (img_width - date_width) // 2
-                date_y = name_y + template.date_position_offset
-                
-                draw.text((date_x, date_y), completion_date, fill=template.date_color, font=font_date)
-                _logger.info(f"Date '{completion_date}' added at ({date_x}, {date_y})")
-            
-            # === TAMBAHKAN SIGNATURE ===
-            if template.show_signature and template.signature_image:
-                try:
-                    sig_data = base64.b64decode(template.signature_image)
-                    signature = Image.open(BytesIO(sig_data))
-                    
-                    sig_width = template.signature_width
-                    sig_height = int(signature.height * (sig_width / signature.width))
-                    signature = signature.resize((sig_width, sig_height), Image.Resampling.LANCZOS)
-                    
-                    sig_x = int(img_width * (template.signature_position_x / 100)) - (sig_width // 2)
-                    sig_y = int(img_height * (template.signature_position_y / 100))
-                    
-                    if signature.mode == 'RGBA':
-                        img.paste(signature, (sig_x, sig_y), signature)
-                    else:
-                        img.paste(signature, (sig_x, sig_y))
-                    
-                    if template.signature_label:
-                        label_bbox = draw.textbbox((0, 0), template.signature_label, font=font_date)
-                        label_width = label_bbox[2] - label_bbox[0]
-                        label_x = sig_x + (sig_width // 2) - (label_width // 2)
-                        label_y = sig_y + sig_height + 10
-                        
-                        draw.text((label_x, label_y), template.signature_label, fill='#000000', font=font_date)
-                    
-                    _logger.info(f"Signature added at ({sig_x}, {sig_y})")
-                except Exception as e:
-                    _logger.error(f"Error adding signature: {e}")
-            
-            # === OUTPUT ===
-            output = BytesIO()
-            img.save(output, format='PNG')
-            output.seek(0)
-            
-            result = base64.b64encode(output.read())
-            _logger.info("=== Custom certificate generated successfully! ===")
-            
-            return result
-            
-        except Exception as e:
-            _logger.error(f"Error generating custom certificate: {str(e)}", exc_info=True)
-            return False
+                result[record.id] = data
+                rendered.append((record.id, attachment_names[record.id], data))
+            if rendered:
+                with metrics.stage('store'):
+                    self._store_certificates(rendered, template.output_mimetype)
+        return result
+
+    def _get_certificate_data(self):
+        """Return the encoded certificate bytes, from storage when possible"""
+        self.ensure_one()
+        return self._get_certificates_data()[self.id]
@@ -0,0 +1,3 @@
+from . import test_render_benchmark
+from . import test_text_layout
+from . import test_editor_layout
@@ -0,0 +1,75 @@
+import base64
+import json
+from io import BytesIO
+
+from PIL import Image
+
+from odoo.exceptions import ValidationError
+from odoo.tests import HttpCase, TransactionCase, tagged
+
+
+def _png(width=200, height=100):
+    output = BytesIO()
+    Image.new('RGB', (width, height), 'white').save(output, format='PNG')
+    return base64.b64encode(output.getvalue())
+
+
+def _layout(**name):
+    return {
+        'canvas_width': 200,
+        'canvas_height': 100,
+        'objects': [dict({'id': 'name', 'left': 10, 'top': 40, 'width': 180, 'fontSize': 20}, **name)],
+    }
+
+
+@tagged('post_install', '-at_install')
+class TestEditorLayout(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.template = cls.env['survey.certificate.template'].create({'name': 'Layout', 'file': _png()})
+
+    def test_validate_layout(self):
+        Template = self.env['survey.certificate.template']
+        Template._validate_layout(_layout())
+        Template._validate_layout(_layout(width=0))
+        for layout in (
+            [],
+            dict(_layout(), canvas_width=0),
+            _layout(fontSize=0),
+            _layout(width=-1),
+            _layout(left='10'),
+            _layout(field='unknown'),
+            _layout(align='justify'),
+            _layout(fill='red'),
+            dict(_layout(), objects=_layout()['objects'] * 2),
+        ):
+            with self.assertRaises(ValidationError, msg=repr(layout)):
+                Template._validate_layout(layout)
+
+    def test_save_editor_layout_revisions(self):
+        revision = self.template.layout_revision
+        self.assertEqual(self.template._save_editor_layout(_layout(), revision), revision + 1)
+        self.assertEqual(json.loads(self.template.layout_json), _layout())
+        # Unchanged layouts do not bump the revision
+        self.assertEqual(self.template._save_editor_layout(_layout(), revision + 1), revision + 1)
+        # A session that started before the last save loses
+        self.assertIs(self.template._save_editor_layout(_layout(top=60), revision), False)
+        self.assertEqual(json.loads(self.template.layout_json), _layout())
+
+
+@tagged('post_install', '-at_install')
+class TestEditorLayoutRoutes(HttpCase):
+
+    def test_save_stale_revision_conflicts(self):
+        template = self.env['survey.certificate.template'].create({'name': 'Layout', 'file': _png()})
+        self.authenticate('admin', 'admin')
+        route = '/certificate/editor/save'
+        saved = self.make_jsonrpc_request(route, {'template_id': template.id, 'layout': _layout(), 'revision': 0})
+        self.assertEqual(saved, {'success': True, 'revision': 1})
+
+        stale = self.make_jsonrpc_request(route, {'template_id': template.id, 'layout': _layout(top=60), 'revision': 0})
+        self.assertFalse(stale['success'])
+        self.assertTrue(stale['conflict'])
+        self.assertEqual(stale['revision'], 1)
@@ -0,0 +1,28 @@
+import os
+import tempfile
+
+from odoo.tests import TransactionCase, tagged
+
+from ..tools.benchmark import run_benchmark, write_results
+
+
+@tagged('-standard', 'certificate_benchmark')
+class TestRenderBenchmark(TransactionCase):
+    """Not a correctness test: measures the render pipeline and writes JSON.
+
+    Run with ``--test-tags certificate_benchmark``; set
+    ``CERTIFICATE_BENCHMARK_OUTPUT`` to choose where results are written.
+    """
+
+    def test_render_benchmark(self):
+        results = run_benchmark(
+            self.env,
+            questions=int(os.environ.get('CERTIFICATE_BENCHMARK_QUESTIONS', 50)),
+            participants=int(os.environ.get('CERTIFICATE_BENCHMARK_PARTICIPANTS', 20)),
+        )
+        output = os.environ.get('CERTIFICATE_BENCHMARK_OUTPUT') or os.path.join(
+            tempfile.gettempdir(), 'certificate_benchmark.json')
+        write_results(results, output)
+        self.assertTrue(results['scenarios'])
+        for scenario in results['scenarios']:
+            self.assertGreater(scenario['single_per_second'], 0)
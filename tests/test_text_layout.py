@@ -0,0 +1,47 @@
+from odoo.tests import TransactionCase, tagged
+
+from ..tools.fonts import get_font, resolve_system_font
+from ..tools.text_layout import fit_text, wrap_text
+
+
+class MonospaceMetrics:
+    """Every character is ``size`` wide and lines are ``size`` high"""
+
+    def width(self, text, size):
+        return len(text) * size
+
+    def height(self, lines, size):
+        return lines * size
+
+
+@tagged('post_install', '-at_install')
+class TestTextLayout(TransactionCase):
+
+    def test_wrap_text(self):
+        metrics = MonospaceMetrics()
+        self.assertEqual(wrap_text(metrics, "aa bb cc", 1, 5, max_lines=3), ["aa bb", "cc"])
+        self.assertEqual(wrap_text(metrics, "aa bb cc", 1, 5, max_lines=1), ["aa bb cc"])
+        self.assertEqual(wrap_text(metrics, "aaaaaaaa", 1, 5, max_lines=2), ["aaaaaaaa"])
+
+    def test_wrap_text_keeps_overflow_on_last_line(self):
+        lines = wrap_text(MonospaceMetrics(), "aa bb cc dd ee", 1, 2, max_lines=2)
+        self.assertEqual(lines, ["aa", "bb cc dd ee"])
+
+    def test_fit_text_shrinks_to_width(self):
+        source = resolve_system_font()
+        if not source:
+            self.skipTest("No TrueType font installed")
+        layout = fit_text(source, "Participant Name", 60, 200)
+        self.assertLess(layout.size, 60)
+        self.assertEqual(layout.lines, ["Participant Name"])
+        self.assertLessEqual(get_font(source, layout.size).getlength(layout.lines[0]), 200)
+
+    def test_fit_text_respects_max_lines(self):
+        source = resolve_system_font()
+        if not source:
+            self.skipTest("No TrueType font installed")
+        name = "Muhammad Abdurrahman Wijayakusuma Setiawan Pratama Hadiningrat Kusumawardhani"
+        layout = fit_text(source, name, 60, 150, max_lines=2)
+        self.assertEqual(layout.size, 8)
+        self.assertEqual(len(layout.lines), 2)
+        self.assertEqual(' '.join(layout.lines), name)
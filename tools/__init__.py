@@ -0,0 +1,11 @@
+from . import bulk
+from . import draw_plan
+from . import fonts
+from . import memory
+from . import metrics
+from . import normalize
+from . import pdf
+from . import qr
+from . import render
+from . import render_cache
+from . import text_layout
@@ -0,0 +1,269 @@
+"""Render throughput benchmark for the certificate pipeline.
+
+Runs inside an Odoo environment, either through the ``certificate_benchmark``
+test tag::
+
+    odoo-bin -d <db> --test-tags certificate_benchmark --stop-after-init
+
+or from ``odoo-bin shell``, which sets up the addons path before the addon
+is imported (roll back afterwards, the benchmark creates surveys)::
+
+    odoo-bin shell -c odoo.conf -d <db>
+    >>> from odoo.addons.survey_certificate_template.tools.benchmark import run_benchmark, write_results
+    >>> write_results(run_benchmark(env, sizes=['a4_150dpi']), 'bench.json')
+    >>> env.cr.rollback()
+
+Results are plain JSON so two runs can be diffed between versions.
+"""
+import base64
+import json
+import logging
+import os
+import resource
+import threading
+import time
+from io import BytesIO
+from PIL import Image, ImageDraw
+
+from .draw_plan import execute_plan, flatten
+from .fonts import load_font
+from .render import encode_png
+
+_logger = logging.getLogger(__name__)
+
+# (label, width, height) of A4 portrait at common print resolutions
+PAGE_SIZES = [
+    ('a4_150dpi', 1240, 1754),
+    ('a4_300dpi', 2480, 3508),
+]
+
+
+def synthetic_image(width, height, mode='RGB', seed_color=(200, 180, 140)):
+    """A noisy gradient, so PNG encoding costs about as much as a real design"""
+    noise = Image.effect_noise((width, height), 48)
+    img = Image.merge('RGB', (noise, noise.point(lambda v: v // 2 + seed_color[1] // 2), noise))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((width // 20, height // 20, width - width // 20, height - height // 20), outline=seed_color, width=12)
+    if mode == 'RGBA':
+        alpha = Image.linear_gradient('L').resize((width, height))
+        img.putalpha(alpha.point(lambda v: 128 + v // 2))
+    return img
+
+
+def _b64_png(img):
+    return base64.b64encode(encode_png(img))
+
+
+def scenarios(sizes=None):
+    """Every combination of page size, colour mode and logo/signature presence"""
+    for label, width, height in PAGE_SIZES:
+        if sizes and label not in sizes:
+            continue
+        for mode in ('RGB', 'RGBA'):
+            for with_assets in (False, True):
+                yield {
+                    'name': f"{label}_{mode.lower()}_{'assets' if with_assets else 'plain'}",
+                    'width': width,
+                    'height': height,
+                    'mode': mode,
+                    'with_assets': with_assets,
+                }
+
+
+def _ms(start):
+    return round((time.perf_counter() - start) * 1000, 3)
+
+
+def _peak_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _current_rss_kb():
+    """Resident memory of this process now, or its peak so far without /proc"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError):
+        return _peak_rss_kb()
+
+
+class PhaseMemory:
+    """Peak resident memory while the block runs, sampled from a thread.
+
+    ``ru_maxrss`` only ever grows over the process lifetime, so it cannot
+    tell two phases of one run apart.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.start_kb = self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak_kb = max(self.peak_kb, _current_rss_kb())
+
+    def __enter__(self):
+        self.start_kb = self.peak_kb = _current_rss_kb()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak_kb = max(self.peak_kb, _current_rss_kb())
+
+    @property
+    def growth_kb(self):
+        return self.peak_kb - self.start_kb
+
+
+def create_synthetic_survey(env, template, questions=50, participants=20):
+    """Certification survey with a name question buried among many others"""
+    survey = env['survey.survey'].create({
+        'title': f"Benchmark survey ({template.name})",
+        'certification': True,
+        'scoring_type': 'scoring_without_answers',
+        'scoring_success_min': 0,
+        'certificate_template_id': template.id,
+    })
+    question_vals = [{
+        'survey_id': survey.id,
+        'title': f"Question {index}",
+        'question_type': 'char_box',
+        'sequence': index,
+    } for index in range(questions - 1)]
+    question_vals.insert(questions // 2, {
+        'survey_id': survey.id,
+        'title': "Full name",
+        'question_type': 'char_box',
+        'sequence': questions // 2,
+    })
+    all_questions = env['survey.question'].create(question_vals)
+    name_question = all_questions.filtered(lambda q: q.title == "Full name")
+    survey.name_question_id = name_question
+
+    user_inputs = env['survey.user_input'].create([{
+        'survey_id': survey.id,
+        'email': f"participant{index}@example.com",
+        'state': 'done',
+    } for index in range(participants)])
+    env['survey.user_input.line'].create([{
+        'user_input_id': user_input.id,
+        'question_id': question.id,
+        'answer_type': 'char_box',
+        'value_char_box': f"Participant Number {user_input.id}" if question == name_question else "answer",
+    } for user_input in user_inputs for question in all_questions])
+    return survey, user_inputs
+
+
+def measure_stages(template, params, repeat=3):
+    """Average per-stage timings (ms) of one render, each stage isolated"""
+    stages = {}
+
+    start = time.perf_counter()
+    for __ in range(repeat):
+        img = Image.open(BytesIO(base64.b64decode(template.file)))
+        flatten(img)
+    stages['decode'] = _ms(start) / repeat
+
+    start = time.perf_counter()
+    for __ in range(repeat):
+        plan = template._compile_draw_plan()
+    stages['composite'] = max(_ms(start) / repeat - stages['decode'], 0.0)
+
+    # Loaded outside the font cache, which belongs to the running server
+    sources = {(op.font_source, op.size) for op in plan.texts if op.font_source is not None}
+    start = time.perf_counter()
+    for __ in range(repeat):
+        for source, size in sources:
+            load_font(source, size)
+    stages['font_load'] = _ms(start) / repeat
+
+    start = time.perf_counter()
+    for __ in range(repeat):
+        img = execute_plan(plan, params)
+    stages['text_draw'] = _ms(start) / repeat
+
+    start = time.perf_counter()
+    for __ in range(repeat):
+        png = encode_png(img)
+    stages['png_encode'] = _ms(start) / repeat
+
+    start = time.perf_counter()
+    for __ in range(repeat):
+        base64.b64encode(png)
+    stages['base64'] = _ms(start) / repeat
+
+    stages = {key: round(value, 3) for key, value in stages.items()}
+    return stages, len(png)
+
+
+def run_benchmark(env, sizes=None, questions=50, participants=20, repeat=3):
+    """Run every scenario and return a JSON-serialisable result dict"""
+    results = {
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'questions': questions,
+        'participants': participants,
+        'scenarios': [],
+    }
+    Template = env['survey.certificate.template']
+
+    for scenario in scenarios(sizes):
+        width, height = scenario['width'], scenario['height']
+        vals = {
+            'name': f"Benchmark {scenario['name']}",
+            'file': _b64_png(synthetic_image(width, height, scenario['mode'])),
+            'filename': 'background.png',
+        }
+        if scenario['with_assets']:
+            vals.update({
+                'show_logo': True,
+                'logo_image': _b64_png(synthetic_image(width // 6, width // 6, 'RGBA', (20, 60, 160))),
+                'logo_width': width // 8,
+                'show_signature': True,
+                'signature_image': _b64_png(synthetic_image(width // 4, width // 10, 'RGBA', (10, 10, 10))),
+                'signature_width': width // 5,
+            })
+        template = Template.create(vals)
+        survey, user_inputs = create_synthetic_survey(env, template, questions, participants)
+        params = user_inputs[:1]._get_certificate_render_params()[user_inputs[0].id]
+
+        stages, png_size = measure_stages(template, params, repeat)
+
+        # Single renders: name lookup + render per participation, warm cache
+        template._get_draw_plan()
+        with PhaseMemory() as single_memory:
+            start = time.perf_counter()
+            for user_input in user_inputs:
+                template._render_certificate(user_input._get_certificate_render_params()[user_input.id])
+            single_seconds = time.perf_counter() - start
+
+        with PhaseMemory() as bulk_memory:
+            start = time.perf_counter()
+            survey._generate_certificates_bulk()
+            bulk_seconds = time.perf_counter() - start
+
+        entry = dict(
+            scenario,
+            stages_ms=stages,
+            png_bytes=png_size,
+            single_per_second=round(len(user_inputs) / single_seconds, 3),
+            bulk_per_second=round(len(user_inputs) / bulk_seconds, 3),
+            single_peak_rss_kb=single_memory.peak_kb,
+            single_rss_growth_kb=single_memory.growth_kb,
+            bulk_peak_rss_kb=bulk_memory.peak_kb,
+            bulk_rss_growth_kb=bulk_memory.growth_kb,
+            process_peak_rss_kb=_peak_rss_kb(),
+        )
+        _logger.info(f"Certificate benchmark {scenario['name']}: {entry}")
+        results['scenarios'].append(entry)
+
+    results['render_cache'] = Template._get_render_cache_stats()
+    return results
+
+
+def write_results(results, path):
+    with open(path, 'w') as output:
+        json.dump(results, output, indent=2, sort_keys=True)
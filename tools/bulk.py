@@ -0,0 +1,56 @@
+import io
+import shutil
+import zipfile
+
+from .render import render_certificate
+
+
+def render_many(plan, jobs, image_format='PNG', **encode_params):
+    """Render ``(key, RenderParams)`` jobs, yielding ``(key, encoded bytes)``.
+
+    Jobs are rendered one after the other in the calling process: forking
+    a threaded server can hand the children locks held by other threads.
+    Large batches go through the render queue instead, whose cron runs
+    claim disjoint jobs and can work in parallel.
+    """
+    for key, params in jobs:
+        yield key, render_certificate(plan, params, image_format, **encode_params)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Unseekable file object keeping what is written until ``take()``"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(entries):
+    """Yield a ZIP archive of ``(name, file path or bytes)`` entries in chunks.
+
+    Entries are read one at a time while the archive is consumed, so memory
+    stays bounded by a single file. Images are already compressed and are
+    stored as they are.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_STORED) as archive:
+        for name, source in entries:
+            if isinstance(source, bytes):
+                archive.writestr(name, source)
+            else:
+                with open(source, 'rb') as src, archive.open(name, 'w') as dest:
+                    shutil.copyfileobj(src, dest, 1024 * 1024)
+            yield sink.take()
+    yield sink.take()
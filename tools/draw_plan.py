@@ -0,0 +1,142 @@
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+from PIL import Image, ImageDraw
+
+from .qr import qr_image
+from .text_layout import fit_text
+
+# One participant-dependent text. ``x`` is the anchor point for ``align``
+# ('left', 'center' or 'right'), ``y`` the top of the text. With a
+# ``max_width`` the text is shrunk from ``size`` (and wrapped onto up to
+# ``max_lines`` lines) to fit ``max_width`` x ``max_height``.
+TextOp = namedtuple(
+    'TextOp',
+    ['field', 'font', 'font_source', 'size', 'color', 'x', 'y', 'align', 'max_width', 'max_height', 'max_lines'],
+    defaults=[0, 0, 1],
+)
+
+# Verification QR code: the participant serial appended to ``url``, drawn
+# ``size`` pixels square with its top-left corner at (``x``, ``y``)
+QrOp = namedtuple('QrOp', ['url', 'x', 'y', 'size'])
+
+# Immutable result of compiling a template revision: the background with
+# every static element already composited, and the texts (and QR code)
+# left to draw.
+DrawPlan = namedtuple('DrawPlan', ['base', 'texts', 'dpi', 'qr'], defaults=[None])
+
+# Held while a plan base is drawn on in place (draw_in_place) or copied, so
+# a copy never sees another render's texts
+_base_lock = threading.Lock()
+
+
+def flatten(img):
+    """Return an RGB copy of ``img`` with transparency composited on white"""
+    if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+        if img.mode != 'RGBA':
+            img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        # An RGBA mask uses its alpha band, without splitting out a copy
+        background.paste(img, mask=img)
+        return background
+    if img.mode != 'RGB':
+        return img.convert('RGB')
+    img.load()
+    return img
+
+
+def paste_scaled(canvas, img, box):
+    """Resize ``img`` to ``box`` = (x, y, width, height) and paste it, keeping alpha"""
+    x, y, width, height = (int(round(v)) for v in box)
+    if width <= 0 or height <= 0:
+        return canvas
+    if img.size != (width, height):
+        img = img.resize((width, height), Image.Resampling.LANCZOS)
+    if img.mode == 'RGBA':
+        canvas.paste(img, (x, y), img)
+    else:
+        canvas.paste(img, (x, y))
+    return canvas
+
+
+def _text_origin(draw, text, font, x, y, align):
+    if align != 'left':
+        bbox = draw.textbbox((0, 0), text, font=font)
+        width = bbox[2] - bbox[0]
+        x = x - width if align == 'right' else x - width // 2
+    return int(x), int(y)
+
+
+def layout_op(draw, op, text):
+    """Return ``[(origin, line, font)]`` placing ``text`` as described by ``op``"""
+    if op.max_width:
+        layout = fit_text(op.font_source, text, op.size, op.max_width, op.max_height, op.max_lines)
+        font, lines, line_height = layout.font, layout.lines, layout.line_height
+    else:
+        font, lines, line_height = op.font, [text], 0
+    return [
+        (_text_origin(draw, line, font, op.x, op.y + index * line_height, op.align), line, font)
+        for index, line in enumerate(lines)
+    ]
+
+
+def draw_op(draw, op, text):
+    """Draw ``text`` as described by the ``TextOp`` ``op``"""
+    for origin, line, font in layout_op(draw, op, text):
+        draw.text(origin, line, fill=op.color, font=font)
+
+
+def execute_plan(plan, params):
+    """Draw the participant-dependent texts of ``params`` on a copy of the plan base"""
+    with _base_lock:
+        img = plan.base.copy()
+    draw = ImageDraw.Draw(img)
+    for op in plan.texts:
+        text = getattr(params, op.field)
+        if text:
+            draw_op(draw, op, str(text))
+    _paste_qr(img, plan.qr, params)
+    return img
+
+
+def _paste_qr(img, qr, params):
+    """Paste the verification QR code of ``params``; returns its box, if any"""
+    if not qr or not params.serial:
+        return None
+    code = qr_image(qr.url + params.serial, qr.size)
+    if code is None:
+        return None
+    img.paste(code, (qr.x, qr.y))
+    return (qr.x, qr.y, qr.x + qr.size, qr.y + qr.size)
+
+
+@contextmanager
+def draw_in_place(plan, params):
+    """Draw the texts of ``params`` on the plan base itself and yield it.
+
+    Only the boxes covered by text are saved and pasted back on exit, so no
+    full-size copy is made. In-place renders of a process are serialized.
+    """
+    with _base_lock:
+        base = plan.base
+        draw = ImageDraw.Draw(base)
+        saved = []
+        try:
+            for op in plan.texts:
+                text = getattr(params, op.field)
+                if not text:
+                    continue
+                for origin, line, font in layout_op(draw, op, str(text)):
+                    left, top, right, bottom = draw.textbbox(origin, line, font=font)
+                    box = (max(left - 1, 0), max(top - 1, 0), min(right + 1, base.width), min(bottom + 1, base.height))
+                    if box[0] < box[2] and box[1] < box[3]:
+                        saved.append((box, base.crop(box)))
+                    draw.text(origin, line, fill=op.color, font=font)
+            if plan.qr and params.serial:
+                box = (plan.qr.x, plan.qr.y, plan.qr.x + plan.qr.size, plan.qr.y + plan.qr.size)
+                saved.append((box, base.crop(box)))
+                _paste_qr(base, plan.qr, params)
+            yield base
+        finally:
+            for box, patch in reversed(saved):
+                base.paste(patch, box[:2])
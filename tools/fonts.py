@@ -0,0 +1,94 @@
+import functools
+import logging
+import threading
+from io import BytesIO
+from PIL import ImageFont
+
+from .render_cache import LRUCache
+
+_logger = logging.getLogger(__name__)
+
+SYSTEM_FONT_PATHS = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
+]
+
+# FreeTypeFont objects keyed on (font key, size), bounded by entry count
+MAX_CACHED_FONTS = 256
+_font_cache = LRUCache(MAX_CACHED_FONTS, sizeof=lambda font: 1)
+# Raw bytes of uploaded fonts, so a new size does not go back to the ORM
+_font_data = {}
+_font_data_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def resolve_system_font(extra_paths=(), bold=True):
+    """Return the first usable system font path, probing the disk once per process"""
+    for path in tuple(extra_paths) + tuple(SYSTEM_FONT_PATHS):
+        if not bold:
+            path = path.replace("-Bold", "")
+        try:
+            ImageFont.truetype(path, 10)
+            return path
+        except OSError:
+            continue
+    _logger.warning("No TrueType font found, certificates will use PIL's default bitmap font")
+    return None
+
+
+def get_font(source, size):
+    """Return a cached FreeTypeFont.
+
+    ``source`` is either a filesystem path, or a ``(key, loader)`` tuple where
+    ``key`` identifies an uploaded font revision and ``loader()`` returns its
+    bytes (``loader`` may also be the bytes themselves). ``None`` falls back
+    to PIL's default font.
+    """
+    if source is None:
+        return ImageFont.load_default()
+
+    key = source if isinstance(source, str) else source[0]
+    font = _font_cache.get((key, size))
+    if font is not None:
+        return font
+    return _font_cache.put((key, size), load_font(source, size))
+
+
+def load_font(source, size):
+    """Load a FreeTypeFont from ``source`` (see ``get_font``), bypassing the font cache"""
+    if isinstance(source, str):
+        return ImageFont.truetype(source, size)
+    key = source[0]
+    with _font_data_lock:
+        data = _font_data.get(key)
+    if data is None:
+        data = source[1]() if callable(source[1]) else source[1]
+        with _font_data_lock:
+            _font_data[key] = data
+    return ImageFont.truetype(BytesIO(data), size)
+
+
+def detach_font_source(source):
+    """Return a picklable copy of ``source`` that no longer needs the ORM"""
+    if source is None or isinstance(source, str) or not callable(source[1]):
+        return source
+    key = source[0]
+    with _font_data_lock:
+        data = _font_data.get(key)
+    if data is None:
+        data = source[1]()
+        with _font_data_lock:
+            _font_data[key] = data
+    return key, data
+
+
+def forget_font(match):
+    """Drop cached fonts and font data whose key satisfies ``match(key)``"""
+    _font_cache.invalidate(lambda cache_key: match(cache_key[0]))
+    with _font_data_lock:
+        for key in [k for k in _font_data if match(k)]:
+            del _font_data[key]
+
+
+def font_cache_stats():
+    return _font_cache.stats()
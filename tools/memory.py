@@ -0,0 +1,85 @@
+import math
+
+from PIL import Image
+
+from .draw_plan import flatten
+
+
+class ImageTooLarge(ValueError):
+    """The decoded image would not fit in the memory budget"""
+
+
+def pixels_nbytes(size, mode):
+    """Approximate in-memory size of an image of ``size`` in ``mode``, as ``image_nbytes``"""
+    return size[0] * size[1] * Image.getmodebands(mode)
+
+
+def flatten_nbytes(size, mode):
+    """Peak memory of decoding an image and flattening it with ``flatten``"""
+    source = pixels_nbytes(size, mode)
+    if mode in ('RGBA', 'LA', 'P'):
+        converted = 0 if mode == 'RGBA' else pixels_nbytes(size, 'RGBA')
+        return source + converted + pixels_nbytes(size, 'RGB')
+    if mode != 'RGB':
+        return source + pixels_nbytes(size, 'RGB')
+    return source
+
+
+def decode_within_budget(img, max_bytes=0, scale=1.0, oversize='downscale'):
+    """Decode a lazily opened image into a flat RGB image scaled by at most ``scale``.
+
+    With a ``max_bytes`` budget the decompressed size is checked from the
+    header before any pixel is decoded. Oversized images are refused
+    (``oversize='refuse'``) or downscaled: JPEGs are decoded at a reduced
+    scale directly, other formats only when their decoded pixels fit the
+    budget, reduced before the flatten step. Raises ``ImageTooLarge`` when
+    the budget cannot be met, e.g. for a non-JPEG whose pixels alone exceed
+    it: such backgrounds are shrunk once at upload (``shrink_to_budget``).
+    """
+    full_width, full_height = img.size
+    target = (max(round(full_width * scale), 1), max(round(full_height * scale), 1))
+
+    if max_bytes and flatten_nbytes(img.size, img.mode) > max_bytes:
+        if oversize == 'refuse':
+            raise ImageTooLarge(
+                f"A {full_width}x{full_height} {img.mode} image needs about "
+                f"{flatten_nbytes(img.size, img.mode) // (1024 * 1024)} MB to render, "
+                f"over the {max_bytes // (1024 * 1024)} MB budget"
+            )
+        ratio = math.sqrt(max_bytes / flatten_nbytes(img.size, img.mode))
+        target = (max(int(full_width * min(scale, ratio)), 1), max(int(full_height * min(scale, ratio)), 1))
+
+    # JPEG decoders can skip to 1/2, 1/4 or 1/8 of the size while decoding:
+    # take the smallest reduction not below the target, more if over budget
+    if img.format == 'JPEG' and target[0] < full_width:
+        sizes = [(math.ceil(full_width / k), math.ceil(full_height / k)) for k in (1, 2, 4, 8)]
+        index = max(i for i, size in enumerate(sizes) if size[0] >= target[0] or i == 0)
+        while max_bytes and index < 3 and flatten_nbytes(sizes[index], 'RGB') > max_bytes:
+            index += 1
+        img.draft('RGB', sizes[index])
+
+    if max_bytes and flatten_nbytes(img.size, img.mode) > max_bytes:
+        if pixels_nbytes(img.size, img.mode) > max_bytes:
+            raise ImageTooLarge(
+                f"A {full_width}x{full_height} {img.mode} {img.format or ''} image cannot be decoded within "
+                f"{max_bytes // (1024 * 1024)} MB, only JPEGs are downscaled while decoding"
+            )
+        factor = math.ceil(img.width / target[0])
+        try:
+            img = img.reduce(factor)
+        except ValueError:
+            raise ImageTooLarge(f"{img.mode} images cannot be downscaled before flattening")
+
+    img = flatten(img)
+    if img.width > target[0]:
+        img = img.resize(target, Image.Resampling.LANCZOS, reducing_gap=3.0)
+    return img
+
+
+def shrink_to_budget(img, max_bytes):
+    """Downscale a decoded image so that rendering it fits ``max_bytes``"""
+    if not max_bytes or flatten_nbytes(img.size, img.mode) <= max_bytes:
+        return img
+    ratio = math.sqrt(max_bytes / flatten_nbytes(img.size, img.mode))
+    size = (max(int(img.width * ratio), 1), max(int(img.height * ratio), 1))
+    return img.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
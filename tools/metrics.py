@@ -0,0 +1,101 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (ms) of the latency histogram buckets
+DEFAULT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, Prometheus style"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'sum_ms': round(self.sum, 3),
+            'buckets': {str(bound): count for bound, count in zip(self.buckets, self.counts)},
+        }
+
+
+class RenderMetrics:
+    """Per-process counters and per-stage latency histograms.
+
+    Odoo runs several worker processes; each keeps its own numbers, so a
+    scraper sees the worker that served the request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.stages = {}
+
+    def inc(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, stage, ms):
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram()
+            histogram.observe(ms)
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block into the ``name`` histogram"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': dict(self.counters),
+                'stages': {name: histogram.snapshot() for name, histogram in self.stages.items()},
+            }
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.stages.clear()
+
+
+def to_prometheus(snapshot, gauges=None, prefix='survey_certificate'):
+    """Render a ``RenderMetrics.snapshot()`` in Prometheus text format"""
+    lines = []
+    for name, value in sorted(snapshot['counters'].items()):
+        metric = f'{prefix}_{name}_total'
+        lines += [f'# TYPE {metric} counter', f'{metric} {value}']
+
+    metric = f'{prefix}_stage_duration_ms'
+    if snapshot['stages']:
+        lines.append(f'# TYPE {metric} histogram')
+    for stage, histogram in sorted(snapshot['stages'].items()):
+        for bound, count in histogram['buckets'].items():
+            lines.append(f'{metric}_bucket{{stage="{stage}",le="{bound}"}} {count}')
+        lines.append(f'{metric}_bucket{{stage="{stage}",le="+Inf"}} {histogram["count"]}')
+        lines.append(f'{metric}_sum{{stage="{stage}"}} {histogram["sum_ms"]}')
+        lines.append(f'{metric}_count{{stage="{stage}"}} {histogram["count"]}')
+
+    for name, value in sorted((gauges or {}).items()):
+        metric = f'{prefix}_{name}'
+        lines += [f'# TYPE {metric} gauge', f'{metric} {value}']
+    return '\n'.join(lines) + '\n'
+
+
+metrics = RenderMetrics()
@@ -0,0 +1,83 @@
+import hashlib
+from collections import namedtuple
+from io import BytesIO
+
+from PIL import Image
+
+from .memory import ImageTooLarge, decode_within_budget, shrink_to_budget
+
+# Background formats accepted at upload
+SUPPORTED_FORMATS = ('PNG', 'JPEG', 'WEBP', 'GIF', 'BMP', 'TIFF')
+
+# What the render path needs to know about an uploaded image, probed once
+ImageInfo = namedtuple('ImageInfo', ['width', 'height', 'mode', 'format', 'dpi', 'checksum'])
+
+
+class InvalidImage(ValueError):
+    """Uploaded data is not a usable image"""
+
+
+def probe_image(raw):
+    """Validate ``raw`` image bytes and return their ``ImageInfo``"""
+    try:
+        img = Image.open(BytesIO(raw))
+        img.verify()
+        img = Image.open(BytesIO(raw))
+    except Image.DecompressionBombError as e:
+        raise InvalidImage(str(e))
+    except (OSError, SyntaxError, ValueError) as e:
+        raise InvalidImage(f"the file is not a readable image ({e})")
+    if img.format not in SUPPORTED_FORMATS:
+        raise InvalidImage(f"{img.format} images are not supported, use one of {', '.join(SUPPORTED_FORMATS)}")
+    dpi = img.info.get('dpi')
+    return ImageInfo(
+        img.width, img.height, img.mode, img.format,
+        float(dpi[0]) if dpi and dpi[0] > 1 else 0.0,
+        hashlib.sha1(raw).hexdigest(),
+    )
+
+
+def normalize_image(raw, max_dimension=0, max_bytes=0, oversize='downscale'):
+    """Decode, flatten to RGB and optionally downscale an uploaded image once.
+
+    Returns ``(ImageInfo of the upload, render-ready bytes)``; the bytes are
+    None when the upload is already an RGB PNG or JPEG within the limits
+    and can be rendered as is. JPEG uploads are normalized to JPEG (quality
+    95), everything else to PNG. Images that cannot be decoded within
+    ``max_bytes`` are, with ``oversize='downscale'``, decoded in full once
+    here and stored small enough for the render budget. Raises
+    ``InvalidImage``.
+    """
+    info = probe_image(raw)
+    scale = 1.0
+    if max_dimension and max(info.width, info.height) > max_dimension:
+        scale = max_dimension / max(info.width, info.height)
+
+    img = Image.open(BytesIO(raw))
+    try:
+        try:
+            normalized = decode_within_budget(img, max_bytes, scale, oversize)
+        except ImageTooLarge:
+            if oversize != 'downscale':
+                raise
+            full = decode_within_budget(Image.open(BytesIO(raw)), 0, scale)
+            normalized = shrink_to_budget(full, max_bytes)
+            del full
+    except ImageTooLarge as e:
+        raise InvalidImage(str(e))
+    except (OSError, SyntaxError, ValueError) as e:
+        raise InvalidImage(f"the image data is damaged ({e})")
+
+    if info.mode == 'RGB' and info.format in ('PNG', 'JPEG') and normalized.size == (info.width, info.height):
+        return info, None
+
+    output = BytesIO()
+    params = {}
+    if info.dpi:
+        ratio = normalized.width / info.width
+        params['dpi'] = (info.dpi * ratio, info.dpi * ratio)
+    if info.format == 'JPEG':
+        normalized.save(output, format='JPEG', quality=95, **params)
+    else:
+        normalized.save(output, format='PNG', **params)
+    return info, output.getvalue()
@@ -0,0 +1,126 @@
+import zlib
+from io import BytesIO
+
+from PIL import Image
+
+DEFAULT_DPI = 150
+
+
+class PdfStreamWriter:
+    """Minimal PDF writer producing one full-page image per page.
+
+    Objects are written as soon as a page is added, so memory stays bounded
+    by a single page whatever the page count. Object 1 is the catalog and
+    object 2 the page tree; both are written last since the page tree has to
+    list every page.
+    """
+
+    def __init__(self, write):
+        self._write_fn = write
+        self._position = 0
+        self._offsets = {}
+        self._page_ids = []
+        self._next_id = 3
+        self._write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def _write(self, data):
+        self._write_fn(data)
+        self._position += len(data)
+
+    def _allocate(self):
+        obj_id = self._next_id
+        self._next_id += 1
+        return obj_id
+
+    def _write_object(self, obj_id, body, stream=None):
+        self._offsets[obj_id] = self._position
+        self._write(f'{obj_id} 0 obj\n'.encode() + body)
+        if stream is not None:
+            self._write(b'\nstream\n')
+            self._write(stream)
+            self._write(b'\nendstream')
+        self._write(b'\nendobj\n')
+
+    def add_image_page(self, data, size, pdf_filter, mode='RGB', dpi=DEFAULT_DPI):
+        """Add a page showing already-encoded image ``data``.
+
+        :param pdf_filter: ``'DCTDecode'`` for JPEG bytes, ``'FlateDecode'``
+            for zlib-compressed raw pixels
+        """
+        width, height = size
+        page_width = width * 72.0 / dpi
+        page_height = height * 72.0 / dpi
+        colorspace = '/DeviceGray' if mode == 'L' else '/DeviceRGB'
+        image_id, content_id, page_id = self._allocate(), self._allocate(), self._allocate()
+
+        self._write_object(image_id, (
+            f'<< /Type /XObject /Subtype /Image /Width {width} /Height {height} '
+            f'/ColorSpace {colorspace} /BitsPerComponent 8 /Filter /{pdf_filter} /Length {len(data)} >>'
+        ).encode(), data)
+        content = f'q {page_width:.2f} 0 0 {page_height:.2f} 0 0 cm /Im0 Do Q'.encode()
+        self._write_object(content_id, f'<< /Length {len(content)} >>'.encode(), content)
+        self._write_object(page_id, (
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {page_width:.2f} {page_height:.2f}] '
+            f'/Resources << /XObject << /Im0 {image_id} 0 R >> >> /Contents {content_id} 0 R >>'
+        ).encode())
+        self._page_ids.append(page_id)
+
+    def close(self):
+        kids = ' '.join(f'{page_id} 0 R' for page_id in self._page_ids)
+        self._write_object(2, f'<< /Type /Pages /Kids [{kids}] /Count {len(self._page_ids)} >>'.encode())
+        self._write_object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+
+        xref_position = self._position
+        size = self._next_id
+        lines = [f'xref\n0 {size}\n', '0000000000 65535 f \n']
+        lines += [f'{self._offsets[obj_id]:010d} 00000 n \n' for obj_id in range(1, size)]
+        lines.append(f'trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref_position}\n%%EOF\n')
+        self._write(''.join(lines).encode())
+
+
+def encode_page_image(img, image_format='jpeg', quality=90):
+    """Return (data, PDF filter name) for an RGB or L image"""
+    if img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB')
+    if image_format == 'jpeg':
+        output = BytesIO()
+        img.save(output, format='JPEG', quality=quality)
+        return output.getvalue(), 'DCTDecode'
+    return zlib.compress(img.tobytes()), 'FlateDecode'
+
+
+def iter_pdf(pages):
+    """Yield a PDF in chunks, one chunk per page.
+
+    ``pages`` yields ``add_image_page`` argument tuples
+    ``(data, size, pdf_filter, mode, dpi)``.
+    """
+    chunks = []
+    writer = PdfStreamWriter(chunks.append)
+    for page in pages:
+        writer.add_image_page(*page)
+        yield b''.join(chunks)
+        chunks.clear()
+    writer.close()
+    yield b''.join(chunks)
+
+
+def iter_image_pdf(sources, dpi=DEFAULT_DPI):
+    """Yield a PDF with one page per encoded image (file path or bytes).
+
+    Images are read one at a time while the PDF is consumed; JPEGs are
+    embedded as they are, other formats re-encoded as JPEG page by page.
+    """
+    def pages():
+        for source in sources:
+            with Image.open(BytesIO(source) if isinstance(source, bytes) else source) as img:
+                if img.format == 'JPEG' and img.mode in ('RGB', 'L'):
+                    if not isinstance(source, bytes):
+                        with open(source, 'rb') as jpeg:
+                            source = jpeg.read()
+                    yield source, img.size, 'DCTDecode', img.mode, dpi
+                else:
+                    data, pdf_filter = encode_page_image(img)
+                    yield data, img.size, pdf_filter, img.mode if img.mode == 'L' else 'RGB', dpi
+
+    return iter_pdf(pages())
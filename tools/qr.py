@@ -0,0 +1,26 @@
+import logging
+
+from PIL import Image
+
+_logger = logging.getLogger(__name__)
+
+try:
+    import qrcode
+except ImportError:
+    qrcode = None
+
+
+def qr_available():
+    return qrcode is not None
+
+
+def qr_image(data, size):
+    """Return an RGB QR code of ``data``, ``size`` pixels square, or None
+    when the optional ``qrcode`` library is not installed"""
+    if qrcode is None:
+        return None
+    qr = qrcode.QRCode(border=1, error_correction=qrcode.constants.ERROR_CORRECT_M)
+    qr.add_data(data)
+    qr.make(fit=True)
+    img = qr.make_image(fill_color='black', back_color='white').convert('RGB')
+    return img.resize((size, size), Image.Resampling.NEAREST)
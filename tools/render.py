@@ -0,0 +1,56 @@
+from collections import namedtuple
+from io import BytesIO
+
+from PIL import Image
+
+from .draw_plan import draw_in_place, execute_plan
+
+# Everything participant-dependent a certificate needs, with no ORM record
+RenderParams = namedtuple(
+    'RenderParams',
+    ['name', 'date_str', 'survey_title', 'score', 'serial'],
+    defaults=['', '', ''],
+)
+
+
+# Output formats by PIL name: (mimetype, file extension)
+OUTPUT_FORMATS = {
+    'PNG': ('image/png', 'png'),
+    'JPEG': ('image/jpeg', 'jpg'),
+    'WEBP': ('image/webp', 'webp'),
+}
+
+
+def format_certificate_date(date):
+    return date.strftime("%B %d, %Y")
+
+
+def encode_image(img, image_format='PNG', colors=0, **params):
+    """Encode ``img`` with PIL save ``params``; ``colors`` quantizes PNGs to
+    a palette of that many colours first (flat-colour designs)."""
+    output = BytesIO()
+    encode_image_to(img, output, image_format, colors, **params)
+    return output.getvalue()
+
+
+def encode_image_to(img, fp, image_format='PNG', colors=0, **params):
+    """Like ``encode_image``, writing into the file object ``fp``"""
+    if colors and image_format == 'PNG':
+        img = img.quantize(colors, method=Image.Quantize.FASTOCTREE)
+    img.save(fp, format=image_format, **params)
+
+
+def encode_png(img):
+    return encode_image(img, 'PNG')
+
+
+def render_certificate(plan, params, image_format='PNG', **encode_params):
+    """Return the encoded certificate of ``params`` (a ``RenderParams``)"""
+    return encode_image(execute_plan(plan, params), image_format, **encode_params)
+
+
+def render_certificate_to(plan, params, fp, image_format='PNG', **encode_params):
+    """Encode the certificate of ``params`` into ``fp``, drawing on the plan
+    base in place instead of a copy (see ``draw_in_place``)"""
+    with draw_in_place(plan, params) as img:
+        encode_image_to(img, fp, image_format, **encode_params)
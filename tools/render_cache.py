@@ -0,0 +1,89 @@
+import threading
+from collections import OrderedDict
+
+
+def image_nbytes(img):
+    """Approximate in-memory size of a decoded PIL image"""
+    return img.width * img.height * len(img.getbands())
+
+
+class LRUCache:
+    """Per-process LRU cache bounded by the total size of its values.
+
+    Odoo serves requests from several threads of the same process, so every
+    access goes through a lock. Values are shared between callers and must
+    be treated as read-only (copy before drawing on a cached image).
+    """
+
+    def __init__(self, max_bytes, sizeof=image_nbytes):
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = self._sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                # Never cache something that would evict everything else
+                return value
+            self._entries[key] = value
+            self._sizes[key] = size
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        return value
+
+    def invalidate(self, match):
+        """Drop every entry whose key satisfies ``match(key)``"""
+        with self._lock:
+            for key in [k for k in self._entries if match(k)]:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.current_bytes = 0
+
+    def resize(self, max_bytes):
+        with self._lock:
+            self.max_bytes = max_bytes
+            while self._entries and self.current_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    def _remove(self, key):
+        del self._entries[key]
+        self.current_bytes -= self._sizes.pop(key)
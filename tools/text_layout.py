@@ -0,0 +1,132 @@
+import threading
+from collections import namedtuple
+
+from .fonts import get_font
+from .render_cache import LRUCache
+
+# Advances are measured once per font at this size and scaled linearly
+REFERENCE_SIZE = 200
+# Measured up front when a font is first used: printable ASCII and Latin-1
+PRELOAD_CHARS = ''.join(chr(c) for c in range(32, 256) if c < 127 or c > 160)
+MIN_FONT_SIZE = 8
+
+# Result of fitting a text: the font at the chosen size, the wrapped lines
+# and the distance between line tops
+TextLayout = namedtuple('TextLayout', ['font', 'size', 'lines', 'line_height'])
+
+
+class GlyphMetrics:
+    """Advance widths of one font, measured once per character at ``REFERENCE_SIZE``.
+
+    Sizing a text at any size is then a sum of table lookups, so fitting
+    thousands of names loads no font and shapes no text until the final size
+    is known.
+    """
+
+    def __init__(self, source):
+        self.font = get_font(source, REFERENCE_SIZE)
+        self.advances = {}
+        self._lock = threading.Lock()
+        ascent, descent = self.font.getmetrics()
+        self.line_height = ascent + descent
+        self._measure(PRELOAD_CHARS)
+
+    def _measure(self, chars):
+        missing = [char for char in set(chars) if char not in self.advances]
+        if missing:
+            with self._lock:
+                for char in missing:
+                    self.advances[char] = self.font.getlength(char)
+
+    def width(self, text, size):
+        if not self.advances.keys() >= set(text):
+            self._measure(text)
+        return sum(self.advances[char] for char in text) * size / REFERENCE_SIZE
+
+    def height(self, lines, size):
+        return self.line_height * size / REFERENCE_SIZE * lines
+
+
+# GlyphMetrics by font key (path, or key of an uploaded font revision)
+_metrics_cache = LRUCache(64, sizeof=lambda metrics: 1)
+
+
+def glyph_metrics(source):
+    key = source if isinstance(source, str) else source[0]
+    metrics = _metrics_cache.get(key)
+    if metrics is None:
+        metrics = _metrics_cache.put(key, GlyphMetrics(source))
+    return metrics
+
+
+def wrap_text(metrics, text, size, max_width, max_lines=1):
+    """Greedily wrap ``text`` on spaces into lines of at most ``max_width``.
+
+    Never returns more than ``max_lines`` lines: words that do not fit are
+    kept on the last line, which is then wider than ``max_width``.
+    """
+    words = text.split()
+    if max_lines <= 1 or len(words) <= 1:
+        return [text]
+
+    space = metrics.width(' ', size)
+    lines, current, current_width = [], [], 0
+    for word in words:
+        word_width = metrics.width(word, size)
+        if current and current_width + space + word_width > max_width:
+            lines.append(' '.join(current))
+            current, current_width = [word], word_width
+        else:
+            current_width += (space if current else 0) + word_width
+            current.append(word)
+    lines.append(' '.join(current))
+    if len(lines) > max_lines:
+        lines[max_lines - 1:] = [' '.join(lines[max_lines - 1:])]
+    return lines
+
+
+def _fit_lines(metrics, text, size, max_width, max_height, max_lines):
+    """Wrapped lines of ``text`` at ``size`` if they fit the box, else None"""
+    lines = wrap_text(metrics, text, size, max_width, max_lines)
+    if max_height and metrics.height(len(lines), size) > max_height:
+        return None
+    if any(metrics.width(line, size) > max_width for line in lines):
+        return None
+    return lines
+
+
+def fit_text(source, text, size, max_width, max_height=0, max_lines=1, min_size=MIN_FONT_SIZE):
+    """Return the ``TextLayout`` of ``text`` at the largest size up to ``size``
+    fitting ``max_width`` (and ``max_height``) on at most ``max_lines`` lines.
+
+    Sizes are binary searched on cached advance tables; the result is checked
+    against the real font, which also accounts for kerning and hinting. Text
+    that does not fit even at ``min_size`` is laid out at ``min_size``, its
+    last line overflowing.
+    """
+    if source is None or not max_width or not text:
+        font = get_font(source, size)
+        return TextLayout(font, size, [text], sum(font.getmetrics()))
+
+    metrics = glyph_metrics(source)
+    min_size = min(min_size, size)
+    best = size
+    lines = _fit_lines(metrics, text, size, max_width, max_height, max_lines)
+    if lines is None:
+        best, low, high = min_size, min_size, size - 1
+        while low <= high:
+            middle = (low + high) // 2
+            fitted = _fit_lines(metrics, text, middle, max_width, max_height, max_lines)
+            if fitted is None:
+                high = middle - 1
+            else:
+                best, lines, low = middle, fitted, middle + 1
+        if lines is None:
+            lines = wrap_text(metrics, text, min_size, max_width, max_lines)
+
+    font = get_font(source, best)
+    while best > min_size and any(font.getlength(line) > max_width for line in lines):
+        best -= 1
+        font = get_font(source, best)
+        lines = wrap_text(metrics, text, best, max_width, max_lines)
+    return TextLayout(font, best, lines, sum(font.getmetrics()))